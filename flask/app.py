@@ -1,86 +1,478 @@
 #!/usr/bin/python3
-from flask import Flask, request, jsonify, render_template_string
+from flask import Flask, Response, request, jsonify, stream_with_context
+import hmac
+import json
+import argparse
+import functools
 import xmlrpc.client
+import http.client
 import time
 from loguru import logger
 import os
 from werkzeug.utils import secure_filename
 import threading
-from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+from shard_ring import ConsistentHashRing
+from upload_manager import UploadManager, new_job_id
+from chunking import chunk_file, resolve_codec, MB, MIN_CHUNK_SIZE, MAX_CHUNK_SIZE
 
 app = Flask(__name__)
 app.config["MAX_CONTENT_LENGTH"] = 16 * 1024 * 1024 * 1024  # 16GB max upload
 
 # Configuration
 MASTER_SERVER_URL = "http://localhost:8000"
+# Comma-separated list of master shard URLs; video metadata is partitioned
+# across them with a consistent-hash ring keyed by video_id
+MASTER_SERVER_URLS = [
+    url.strip()
+    for url in os.environ.get("MASTER_SERVER_URLS", MASTER_SERVER_URL).split(",")
+    if url.strip()
+]
 UPLOAD_FOLDER = "./uploads"
 ALLOWED_EXTENSIONS = {"mp4", "avi", "mov", "mkv"}
+DASHBOARD_CACHE_TTL = 5  # seconds a snapshot is served before it is refreshed
+SSE_KEEPALIVE_INTERVAL = 15
+UPLOAD_JOB_WORKERS = 4  # uploads chunked and registered concurrently
+UPLOAD_CHUNK_WORKERS = 16  # global limit on in-flight chunk uploads
+UPLOAD_PER_SERVER_LIMIT = 4  # in-flight chunk uploads per chunk server
+UPLOAD_CHUNK_RETRIES = 3
+MASTER_PROBE_INTERVAL = 5  # seconds between background master health checks
+MASTER_RPC_TIMEOUT = 2  # seconds before a hung master is treated as down
+# Writes are not idempotent and may carry many videos; a slow master must not
+# be given up on while it can still commit them
+MASTER_WRITE_TIMEOUT = 30
+CHUNK_RPC_TIMEOUT = 30  # seconds per chunk server call (chunks are up to 64 MB)
+# Adding shards is disabled unless this is set; clients send it as X-Admin-Token
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+
+
+class _TimeoutMixin:
+    """Makes an XML-RPC transport's connections give up after ``timeout`` s."""
+
+    def __init__(self, timeout, **kwargs):
+        super().__init__(**kwargs)
+        self.timeout = timeout
+
+    def make_connection(self, host):
+        conn = super().make_connection(host)
+        conn.timeout = self.timeout
+        return conn
+
+
+class TimeoutTransport(_TimeoutMixin, xmlrpc.client.Transport):
+    pass
+
+
+class SafeTimeoutTransport(_TimeoutMixin, xmlrpc.client.SafeTransport):
+    pass
+
+
+def rpc_proxy(url, timeout):
+    """ServerProxy for ``url`` whose calls raise socket.timeout when hung."""
+    if urlsplit(url).scheme == "https":
+        transport = SafeTimeoutTransport(timeout)
+    else:
+        transport = TimeoutTransport(timeout)
+    return xmlrpc.client.ServerProxy(url, transport=transport, allow_none=True)
 
 
 class MasterClient:
-    def __init__(self):
-        self.master = xmlrpc.client.ServerProxy(MASTER_SERVER_URL)
-        self.connected = False
-        self.test_connection()
+    """Routes metadata calls to master shards.
+
+    Nothing is contacted at construction time. Shard health starts unknown,
+    is updated by every call, and a background probe started on first use
+    marks shards up again once they come back. Calls time out after
+    MASTER_RPC_TIMEOUT, so a hung shard is marked down rather than blocking.
+    """
+
+    def __init__(self, master_urls=None, probe_interval=MASTER_PROBE_INTERVAL):
+        self.ring = ConsistentHashRing()
+        self.masters = []
+        # Version of the shard map (stored on the masters) this ring reflects;
+        # 0 means MASTER_SERVER_URLS is used as given
+        self.map_version = 0
+        # Ring before the last shard was added; reads fall back to it on a miss
+        self.previous_ring = None
+        # Held for a whole add_shard and while adopting a shard map
+        self._map_lock = threading.RLock()
+        # ServerProxy is not thread-safe; each thread gets its own per shard
+        self._local = threading.local()
+        # url -> True (up), False (down) or None (not contacted yet)
+        self.shard_status = {}
+        self.probe_interval = probe_interval
+        self._prober = None
+        self._prober_lock = threading.Lock()
+        self._probing = set()  # urls with a probe in flight
+
+        for url in master_urls or MASTER_SERVER_URLS:
+            self._attach_shard(url)
+
+    @property
+    def connected(self):
+        self._start_probe()
+        return any(status is not False for status in self.shard_status.values())
+
+    def _attach_shard(self, url):
+        self.masters = self.masters + [url]
+        self.shard_status.setdefault(url, None)
+        self.ring.add_shard(url)
+
+    def _adopt_shard_map(self, shard_map):
+        with self._map_lock:
+            if shard_map["version"] <= self.map_version or not shard_map["shards"]:
+                return False
+
+            for url in shard_map["shards"]:
+                self.shard_status.setdefault(url, None)
+            # Swap in a new ring rather than mutating the one readers are using
+            self.previous_ring = self.ring
+            self.ring = ConsistentHashRing(shard_map["shards"], self.ring.replicas)
+            self.masters = list(shard_map["shards"])
+            self.map_version = shard_map["version"]
+        logger.info(
+            "Adopted shard map", version=self.map_version, shards=self.masters
+        )
+        return True
 
-    def test_connection(self):
+    def refresh_shard_map(self, url):
+        """Pick up shards added by other app processes."""
         try:
-            self.master.ping()
-            self.connected = True
-            logger.info("Connected to master server")
+            self._adopt_shard_map(self._call(url, "get_shard_map"))
         except Exception as e:
-            logger.error(f"Failed to connect to master: {e}")
-            self.connected = False
+            logger.error(f"Reading shard map from {url} failed: {e}")
+
+    def _master(self, url, timeout):
+        proxies = self._local.__dict__.setdefault("proxies", {})
+        if (url, timeout) not in proxies:
+            proxies[url, timeout] = rpc_proxy(url, timeout)
+        return proxies[url, timeout]
+
+    def _set_status(self, url, up, error=None):
+        if self.shard_status.get(url) != up:
+            if up:
+                logger.info(f"Connected to master shard {url}")
+            else:
+                logger.error(f"Lost connection to master shard {url}: {error}")
+        self.shard_status[url] = up
+
+    def _call(self, url, method, *args, timeout=MASTER_RPC_TIMEOUT):
+        try:
+            result = getattr(self._master(url, timeout), method)(*args)
+        except (OSError, http.client.HTTPException) as e:  # incl. socket.timeout
+            # Drop this thread's proxy so the next call opens a fresh connection
+            self._local.__dict__.get("proxies", {}).pop((url, timeout), None)
+            self._set_status(url, False, e)
+            raise ConnectionError(f"Master shard {url} unavailable: {e}") from e
+
+        self._set_status(url, True)
+        return result
+
+    def _start_probe(self):
+        if self._prober is not None:
+            return
+
+        with self._prober_lock:
+            if self._prober is not None:
+                return
+
+            def probe_loop():
+                while True:
+                    self.test_connection()
+                    time.sleep(self.probe_interval)
+
+            self._prober = threading.Thread(target=probe_loop, daemon=True)
+            self._prober.start()
+
+    def test_connection(self):
+        # One thread per shard so a hung shard cannot delay probing the rest
+        for url in list(self.masters):
+            with self._prober_lock:
+                if url in self._probing:
+                    continue
+                self._probing.add(url)
+            threading.Thread(target=self._probe_shard, args=(url,), daemon=True).start()
+
+    def _probe_shard(self, url):
+        try:
+            self._call(url, "ping")
+            self.refresh_shard_map(url)
+        except ConnectionError:
+            pass
+        finally:
+            with self._prober_lock:
+                self._probing.discard(url)
+
+    def _master_for(self, video_id):
+        url = self.ring.get_shard(video_id)
+        if self.shard_status.get(url) is False:
+            raise ConnectionError(f"Not connected to master shard {url}")
+        return url
+
+    def _fan_out(self, method, *args):
+        results = {}
+        for url in list(self.masters):
+            if self.shard_status.get(url) is False:
+                continue
+            try:
+                results[url] = self._call(url, method, *args)
+            except Exception as e:
+                logger.error(f"{method} failed on master shard {url}: {e}")
+        return results
 
     def register_upload(self, video_data):
         if not self.connected:
             raise ConnectionError("Not connected to master server")
-        return self.master.register_video(video_data)
+        url = self._master_for(video_data["video_id"])
+        return self._call(
+            url, "register_video", video_data, timeout=MASTER_WRITE_TIMEOUT
+        )
+
+    def video_registered(self, video_id):
+        """Ask the owning shard directly, even if it was just marked down."""
+        url = self.ring.get_shard(video_id)
+        video = self._call(
+            url, "get_video_details", video_id, timeout=MASTER_WRITE_TIMEOUT
+        )
+        return video is not None
 
-    def get_system_status(self):
+    def get_video_details(self, video_id):
+        if not self.connected:
+            return None
+
+        url = self._master_for(video_id)
+        video = self._call(url, "get_video_details", video_id)
+        previous = self.previous_ring
+        if video is None and previous is not None:
+            # Processes that have not adopted the newest shard map yet still
+            # register on the previous owner until the catch-up pass moves them
+            old_url = previous.get_shard(video_id)
+            if old_url != url and self.shard_status.get(old_url) is not False:
+                video = self._call(old_url, "get_video_details", video_id)
+        return video
+
+    def list_videos(self):
+        if not self.connected:
+            return []
+
+        videos = []
+        for shard_videos in self._fan_out("list_videos").values():
+            videos.extend(shard_videos)
+        return sorted(videos, key=lambda v: v["upload_time"], reverse=True)
+
+    def get_system_status(self, chunk_servers=None):
+        """Aggregate shard statuses; pass ``chunk_servers`` if already fetched."""
         if not self.connected:
             return {"error": "Not connected to master"}
-        return self.master.get_system_status()
+
+        statuses = list(self._fan_out("get_system_status").values())
+        if not statuses:
+            return {"error": "Not connected to master"}
+
+        total_storage_gb = sum(s["total_storage_bytes"] for s in statuses) / (1024**3)
+        # Each chunk server heartbeats to a single shard, so count distinct ids
+        if chunk_servers is None:
+            chunk_servers = self.get_chunk_servers()
+        active_servers = len(chunk_servers)
+
+        return {
+            "connected": True,
+            "shards": len(statuses),
+            "shards_total": len(self.masters),
+            "active_servers": active_servers,
+            "total_videos": sum(s["total_videos"] for s in statuses),
+            "uploads_today": sum(s["uploads_today"] for s in statuses),
+            "total_storage": f"{total_storage_gb:.2f} GB",
+            "health": (
+                "healthy"
+                if active_servers > 0 and len(statuses) == len(self.masters)
+                else "degraded"
+            ),
+            "timestamp": time.time(),
+        }
 
     def get_chunk_servers(self):
         if not self.connected:
             return []
-        return self.master.get_chunk_servers()
 
+        # Chunk servers heartbeat to one shard each; merge and de-duplicate
+        servers = {}
+        for shard_servers in self._fan_out("get_chunk_servers").values():
+            for server in shard_servers:
+                known = servers.get(server["id"])
+                if known is None or server["last_seen"] > known["last_seen"]:
+                    servers[server["id"]] = server
+        return sorted(servers.values(), key=lambda s: s["id"])
+
+    def _videos_owned_by(self, url, ring):
+        moves = {}
+        for source_url, shard_videos in self._fan_out("list_videos").items():
+            if source_url == url:
+                continue
+            video_ids = [
+                v["video_id"]
+                for v in shard_videos
+                if ring.get_shard(v["video_id"]) == url
+            ]
+            if video_ids:
+                moves[source_url] = video_ids
+        return moves
+
+    def _copy_videos(self, moves, url):
+        for source_url, video_ids in moves.items():
+            if not video_ids:
+                continue
+            videos = [
+                self._call(source_url, "get_video_details", video_id)
+                for video_id in video_ids
+            ]
+            self._call(
+                url,
+                "import_videos",
+                [v for v in videos if v],
+                timeout=MASTER_WRITE_TIMEOUT,
+            )
 
-# Global master client
-master_client = MasterClient()
+    def _move_videos(self, url, ring, copied=None):
+        """Copy videos ``url`` owns on ``ring`` to it, then drop the originals."""
+        copied = copied or {}
+        moves = self._videos_owned_by(url, ring)
+        late = {
+            source_url: [v for v in video_ids if v not in copied.get(source_url, [])]
+            for source_url, video_ids in moves.items()
+        }
+        self._copy_videos(late, url)
 
+        moved = 0
+        for source_url in set(copied) | set(late):
+            video_ids = copied.get(source_url, []) + late.get(source_url, [])
+            self._call(
+                source_url, "drop_videos", video_ids, timeout=MASTER_WRITE_TIMEOUT
+            )
+            moved += len(video_ids)
 
-def allowed_file(filename):
-    return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
+            logger.info(
+                "Rebalanced videos",
+                source=source_url,
+                target=url,
+                count=len(video_ids),
+            )
+        return moved
+
+    def _refresh_shard_maps(self):
+        """Adopt the highest-version shard map held by any reachable master."""
+        for url in list(self.masters):
+            try:
+                self._adopt_shard_map(self._call(url, "get_shard_map"))
+            except ConnectionError:
+                pass
+
+    def _publish_shard_map(self, shards, base_version):
+        shard_map = {"version": base_version + 1, "shards": shards}
+        # Every process adding a shard on top of the same map asks the same
+        # master first, so it serializes concurrent adds across processes
+        authority = min(self.masters)
+        if not self._call(
+            authority,
+            "set_shard_map",
+            shard_map,
+            base_version,
+            timeout=MASTER_WRITE_TIMEOUT,
+        ):
+            raise RuntimeError(
+                f"Shard map changed since version {base_version}; retry the add"
+            )
 
+        for master_url in shards:
+            if master_url == authority:
+                continue
+            try:
+                self._call(
+                    master_url,
+                    "set_shard_map",
+                    shard_map,
+                    base_version,
+                    timeout=MASTER_WRITE_TIMEOUT,
+                )
+            except Exception as e:
+                logger.error(f"Publishing shard map to {master_url} failed: {e}")
+        return shard_map
+
+    def add_shard(self, url):
+        """Add a master shard and move the videos it now owns onto it.
+
+        The ring only changes once the new shard has answered, holds a copy
+        of every moving video and the new shard map has been accepted, so
+        reads keep going to the old shards until then. Any failure before that
+        point leaves the ring untouched and removes the copies again.
+        """
+        with self._map_lock:
+            self._refresh_shard_maps()
+            if url in self.masters:
+                return 0
+
+            base_version = self.map_version
+            shards = self.masters + [url]
+            new_ring = ConsistentHashRing(shards, self.ring.replicas)
+            copied = {}
+            try:
+                # Only masters expose the shard map; this also rejects chunk servers
+                self._call(url, "get_shard_map")
+                copied = self._videos_owned_by(url, new_ring)
+                self._copy_videos(copied, url)
+                shard_map = self._publish_shard_map(shards, base_version)
+            except Exception:
+                self._discard_copies(copied, url)
+                self.shard_status.pop(url, None)
+                raise
+
+            self._adopt_shard_map(shard_map)
+            # Also moves videos this process registered while the copy ran
+            moved = self._move_videos(url, new_ring, copied)
+
+        # Other processes register on the old owners until their next probe
+        catch_up = threading.Timer(2 * self.probe_interval, self._catch_up, (url,))
+        catch_up.daemon = True
+        catch_up.start()
+        return moved
+
+    def _discard_copies(self, copied, url):
+        video_ids = [v for video_ids in copied.values() for v in video_ids]
+        if not video_ids:
+            return
+        try:
+            self._call(url, "drop_videos", video_ids, timeout=MASTER_WRITE_TIMEOUT)
+        except Exception as e:
+            logger.error(f"Removing copies from {url} failed: {e}")
 
-def chunk_file(file_path, chunk_size=10 * 1024 * 1024):  # 10MB chunks
-    chunks = []
-    chunk_id = 0
+    def _catch_up(self, url):
+        with self._map_lock:
+            try:
+                moved = self._move_videos(url, self.ring)
+            except Exception as e:
+                logger.error(f"Catch-up rebalance to {url} failed: {e}")
+                return
+        if moved:
+            logger.info("Caught up late videos", target=url, count=moved)
 
-    with open(file_path, "rb") as f:
-        while True:
-            chunk_data = f.read(chunk_size)
-            if not chunk_data:
-                break
 
-            chunk_info = {
-                "chunk_id": f"{os.path.basename(file_path)}_{chunk_id}",
-                "data": chunk_data,
-                "size": len(chunk_data),
-                "sequence": chunk_id,
-            }
-            chunks.append(chunk_info)
-            chunk_id += 1
+# Global master client
+master_client = MasterClient()
 
-    return chunks
+
+def allowed_file(filename):
+    return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
 def upload_chunk_to_server(chunk_info, chunk_server):
     try:
-        time.sleep(0.1)  # Simulate upload time
+        address = chunk_server.get("info", {}).get("address")
+        if address:
+            proxy = rpc_proxy(address, CHUNK_RPC_TIMEOUT)
+            proxy.store_chunk(
+                chunk_info["chunk_id"], xmlrpc.client.Binary(chunk_info["data"])
+            )
+        else:
+            time.sleep(0.1)  # Simulate upload to a server without an RPC endpoint
         logger.info(f"Uploaded chunk {chunk_info['chunk_id']} to {chunk_server}")
         return True
     except Exception as e:
@@ -88,18 +480,120 @@ def upload_chunk_to_server(chunk_info, chunk_server):
         return False
 
 
-# Flask Routes
-@app.route("/")
-def dashboard():
+def delete_chunk_from_server(chunk_info, chunk_server):
+    address = chunk_server.get("info", {}).get("address")
+    if address:
+        rpc_proxy(address, CHUNK_RPC_TIMEOUT).delete_chunk(
+            chunk_info["chunk_id"]
+        )
+
+
+upload_manager = UploadManager(
+    upload_chunk_to_server,
+    delete_chunk=delete_chunk_from_server,
+    job_workers=UPLOAD_JOB_WORKERS,
+    chunk_workers=UPLOAD_CHUNK_WORKERS,
+    per_server_limit=UPLOAD_PER_SERVER_LIMIT,
+    max_retries=UPLOAD_CHUNK_RETRIES,
+)
+
+
+class SnapshotCache:
+    """Caches dashboard data so page views never wait on the master.
+
+    A background thread refreshes the snapshot every ``refresh_interval``
+    seconds. Readers that find it older than ``ttl`` trigger at most one
+    refresh at a time (single flight) and otherwise get the stale copy.
+    """
+
+    def __init__(self, loader, ttl=DASHBOARD_CACHE_TTL, refresh_interval=None):
+        self.loader = loader
+        self.ttl = ttl
+        self.refresh_interval = refresh_interval or ttl / 2
+        self.version = 0
+
+        self._value = None
+        self._loaded_at = 0
+        self._refresh_lock = threading.Lock()
+        self._updated = threading.Condition()
+        self._refresher = None
+
+    def is_fresh(self):
+        return self._value is not None and time.time() - self._loaded_at < self.ttl
+
+    def get(self):
+        self.start()
+        if not self.is_fresh():
+            # Only block when there is nothing at all to serve yet
+            self.refresh(wait=self._value is None)
+        return self._value
+
+    def refresh(self, wait=True):
+        if not self._refresh_lock.acquire(blocking=wait):
+            return False
+
+        try:
+            if wait and self.is_fresh():
+                return False  # Another thread refreshed while we waited
+
+            value = self.loader()
+            with self._updated:
+                self._value = value
+                self._loaded_at = time.time()
+                self.version += 1
+                self._updated.notify_all()
+            return True
+        finally:
+            self._refresh_lock.release()
+
+    def wait_for_update(self, version, timeout=None):
+        with self._updated:
+            self._updated.wait_for(lambda: self.version != version, timeout)
+            return self.version, self._value
+
+    def start(self):
+        if self._refresher is not None:
+            return
+
+        with self._updated:
+            if self._refresher is not None:
+                return
+
+            def refresh_loop():
+                while True:
+                    try:
+                        self.refresh(wait=False)
+                    except Exception as e:
+                        logger.error(f"Dashboard snapshot refresh failed: {e}")
+                    time.sleep(self.refresh_interval)
+
+            self._refresher = threading.Thread(target=refresh_loop, daemon=True)
+            self._refresher.start()
+
+
+def load_dashboard_snapshot():
     try:
-        system_status = master_client.get_system_status()
         chunk_servers = master_client.get_chunk_servers()
+        system_status = master_client.get_system_status(chunk_servers)
     except Exception as e:
         system_status = {"error": str(e)}
         chunk_servers = []
 
-    return render_template_string(
-        """
+    return {"system_status": system_status, "chunk_servers": chunk_servers}
+
+
+def metrics_from_status(system_status):
+    return {
+        "uploads_today": system_status.get("uploads_today", 0),
+        "total_storage": system_status.get("total_storage", "0 GB"),
+        "health": system_status.get("health", "unknown"),
+        "active_servers": system_status.get("active_servers", 0),
+    }
+
+
+dashboard_cache = SnapshotCache(load_dashboard_snapshot)
+
+DASHBOARD_TEMPLATE_SOURCE = """
         <!DOCTYPE html>
         <html>
         <head>
@@ -121,7 +615,7 @@ def dashboard():
                 <div class="card {{ 'success' if system_status.connected else 'error' }}">
                     <h3>Master Server Status</h3>
                     <p>Connected: {{ system_status.connected }}</p>
-                    <p>Active Servers: {{ system_status.active_servers or 0 }}</p>
+                    <p>Active Servers: <span id="active-servers">{{ system_status.active_servers or 0 }}</span></p>
                     <p>Total Videos: {{ system_status.total_videos or 0 }}</p>
                 </div>
 
@@ -141,6 +635,13 @@ def dashboard():
                     <input type="file" name="video" accept="video/*" required>
                     <input type="text" name="title" placeholder="Video Title" required>
                     <textarea name="description" placeholder="Description"></textarea>
+                    <input type="number" name="chunk_size_mb" min="1" max="64" placeholder="Chunk size (MB, auto)">
+                    <select name="compression">
+                        <option value="none">No compression</option>
+                        <option value="zstd">zstd</option>
+                        <option value="lz4">lz4</option>
+                        <option value="zlib">zlib</option>
+                    </select>
                     <button type="submit">Upload Video</button>
                 </form>
             </div>
@@ -152,22 +653,45 @@ def dashboard():
             </div>
 
             <script>
+                function showMetrics(data) {
+                    document.getElementById('metrics').innerHTML =
+                        'Uploads Today: ' + data.uploads_today + '<br>' +
+                        'Total Storage: ' + data.total_storage + '<br>' +
+                        'System Health: ' + data.health;
+                    document.getElementById('active-servers').textContent =
+                        data.active_servers;
+                }
+
                 function refreshMetrics() {
                     fetch('/api/metrics')
                         .then(r => r.json())
-                        .then(data => {
-                            document.getElementById('metrics').innerHTML =
-                                'Uploads Today: ' + data.uploads_today + '<br>' +
-                                'Total Storage: ' + data.total_storage + '<br>' +
-                                'System Health: ' + data.health;
-                        });
+                        .then(showMetrics);
+                }
+
+                // Live updates pushed from the server-side snapshot cache
+                if (window.EventSource) {
+                    const stream = new EventSource('/api/metrics/stream');
+                    stream.onmessage = e => showMetrics(JSON.parse(e.data));
                 }
             </script>
         </body>
         </html>
-    """,
-        system_status=system_status,
-        chunk_servers=chunk_servers,
+"""
+
+
+@functools.cache
+def dashboard_template():
+    # Compiled on the first page view (not at import) and reused afterwards
+    return app.jinja_env.from_string(DASHBOARD_TEMPLATE_SOURCE)
+
+
+# Flask Routes
+@app.route("/")
+def dashboard():
+    snapshot = dashboard_cache.get()
+    return dashboard_template().render(
+        system_status=snapshot["system_status"],
+        chunk_servers=snapshot["chunk_servers"],
     )
 
 
@@ -179,25 +703,59 @@ def upload_video():
     file = request.files["video"]
     title = request.form.get("title", "Untitled")
 
+    # Optional per-upload chunking overrides; chunk size is otherwise adaptive
+    chunk_size = None
+    chunk_size_mb = request.form.get("chunk_size_mb", "").strip()
+    if chunk_size_mb:
+        min_mb, max_mb = MIN_CHUNK_SIZE // MB, MAX_CHUNK_SIZE // MB
+        if not chunk_size_mb.isdecimal() or not (
+            min_mb <= int(chunk_size_mb) <= max_mb
+        ):
+            return (
+                jsonify(
+                    {
+                        "error": "chunk_size_mb must be an integer from "
+                        f"{min_mb} to {max_mb}"
+                    }
+                ),
+                400,
+            )
+        chunk_size = int(chunk_size_mb) * MB
+
+    try:
+        codec = resolve_codec(request.form.get("compression", "none"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
     if file.filename == "":
         return jsonify({"error": "No selected file"}), 400
 
     if file and allowed_file(file.filename):
+        filename = secure_filename(file.filename)
+        # Keyed by job id so concurrent uploads of the same file never collide
+        job_id = new_job_id()
+        file_path = os.path.join(UPLOAD_FOLDER, f"{job_id}_{filename}")
         try:
-            filename = secure_filename(file.filename)
-            file_path = os.path.join(UPLOAD_FOLDER, filename)
             os.makedirs(UPLOAD_FOLDER, exist_ok=True)
             file.save(file_path)
 
-            threading.Thread(
-                target=process_video_upload,
-                args=(file_path, title, request.form.get("description")),
-            ).start()
+            job = upload_manager.submit(
+                process_video_upload,
+                file_path,
+                title,
+                request.form.get("description"),
+                chunk_size,
+                codec,
+                title=title,
+                filename=filename,
+                job_id=job_id,
+            )
 
             return (
                 jsonify(
                     {
-                        "message": "Video upload started",
+                        "message": "Video upload queued",
+                        "job_id": job.job_id,
                         "filename": filename,
                         "title": title,
                     }
@@ -207,74 +765,173 @@ def upload_video():
 
         except Exception as e:
             logger.error(f"Upload failed: {e}")
+            if os.path.exists(file_path):
+                os.remove(file_path)
             return jsonify({"error": str(e)}), 500
 
     return jsonify({"error": "Invalid file type"}), 400
 
 
-def process_video_upload(file_path, title, description):
-    try:
-        logger.info(f"Processing video upload: {title}")
-
-        chunks = chunk_file(file_path)
-        logger.info(f"Split into {len(chunks)} chunks")
+def process_video_upload(job, file_path, title, description, chunk_size, codec):
+    # Runs on the upload manager's job pool; exceptions mark the job failed
+    logger.info(f"Processing video upload: {title}")
 
+    video_id = f"vid_{job.job_id}"
+    try:
         chunk_servers = master_client.get_chunk_servers()
+        chunks = chunk_file(
+            file_path,
+            chunk_size=chunk_size,
+            server_count=len(chunk_servers),
+            codec=codec,
+            chunk_prefix=video_id,
+        )
+    finally:
+        # Chunks are held in memory from here on; the upload is no longer needed
+        os.remove(file_path)
+    logger.info(f"Split into {len(chunks)} chunks")
+
+    placements = upload_manager.upload_chunks(job, chunks, chunk_servers)
+
+    video_data = {
+        "video_id": video_id,
+        "title": title,
+        "description": description,
+        "filename": job.filename,
+        "chunk_count": len(chunks),
+        "chunk_ids": [chunk["chunk_id"] for chunk in chunks],
+        "chunk_servers": placements,
+        "chunk_size": chunks[0]["size"] if chunks else 0,
+        "codec": codec,
+        "chunk_codecs": [chunk["codec"] for chunk in chunks],
+        "total_size": sum(chunk["size"] for chunk in chunks),
+        "stored_size": sum(chunk["stored_size"] for chunk in chunks),
+        "upload_time": time.time(),
+    }
 
-        with ThreadPoolExecutor(max_workers=5) as executor:
-            futures = []
-            for chunk in chunks:
-                server = chunk_servers[len(futures) % len(chunk_servers)]
-                future = executor.submit(upload_chunk_to_server, chunk, server)
-                futures.append(future)
-
-            results = [f.result() for f in futures]
-
-        video_data = {
-            "video_id": f"vid_{int(time.time())}",
-            "title": title,
-            "description": description,
-            "filename": os.path.basename(file_path),
-            "chunk_count": len(chunks),
-            "total_size": sum(chunk["size"] for chunk in chunks),
-            "upload_time": time.time(),
-        }
-
+    try:
         master_client.register_upload(video_data)
-        logger.info(f"Successfully uploaded video: {title}")
+    except Exception as e:
+        # A timed-out master may still have committed the registration, so
+        # only delete the chunks once it is known not to have
+        try:
+            registered = master_client.video_registered(video_id)
+        except Exception:
+            logger.error(f"Keeping chunks of {video_id}: registration unknown")
+            raise e
+        if not registered:
+            upload_manager.discard_chunks(chunks, placements, chunk_servers)
+            raise
+        logger.warning(f"Registration of {video_id} succeeded despite: {e}")
+    logger.info(f"Successfully uploaded video: {title}")
 
-        os.remove(file_path)
 
-    except Exception as e:
-        logger.error(f"Video processing failed: {e}")
+@app.route("/api/uploads")
+def get_uploads():
+    return jsonify(upload_manager.get_status())
+
+
+@app.route("/api/uploads/<job_id>")
+def get_upload(job_id):
+    job = upload_manager.get_job(job_id)
+    if job is None:
+        return jsonify({"error": "Upload job not found"}), 404
+    return jsonify(job)
 
 
 @app.route("/api/metrics")
 def get_metrics():
+    system_status = dashboard_cache.get()["system_status"]
+    return jsonify(metrics_from_status(system_status))
+
+
+@app.route("/api/metrics/stream")
+def stream_metrics():
+    def events():
+        snapshot = dashboard_cache.get()
+        version = dashboard_cache.version
+        while True:
+            metrics = metrics_from_status(snapshot["system_status"])
+            yield f"data: {json.dumps(metrics)}\n\n"
+
+            new_version, snapshot = dashboard_cache.wait_for_update(
+                version, timeout=SSE_KEEPALIVE_INTERVAL
+            )
+            while new_version == version:
+                yield ": keep-alive\n\n"
+                new_version, snapshot = dashboard_cache.wait_for_update(
+                    version, timeout=SSE_KEEPALIVE_INTERVAL
+                )
+            version = new_version
+
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
+    )
+
+
+@app.route("/api/servers")
+def get_servers():
+    return jsonify(dashboard_cache.get()["chunk_servers"])
+
+
+@app.route("/api/videos")
+def get_videos():
     try:
-        system_status = master_client.get_system_status()
-        return jsonify(
-            {
-                "uploads_today": system_status.get("uploads_today", 0),
-                "total_storage": system_status.get("total_storage", "0 GB"),
-                "health": system_status.get("health", "unknown"),
-                "active_servers": system_status.get("active_servers", 0),
-            }
-        )
+        return jsonify(master_client.list_videos())
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
-@app.route("/api/servers")
-def get_servers():
+@app.route("/api/videos/<video_id>")
+def get_video(video_id):
     try:
-        servers = master_client.get_chunk_servers()
-        return jsonify(servers)
+        video = master_client.get_video_details(video_id)
+        if video is None:
+            return jsonify({"error": "Video not found"}), 404
+        return jsonify(video)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+@app.route("/api/shards", methods=["GET", "POST"])
+def shards():
+    if request.method == "POST":
+        token = request.headers.get("X-Admin-Token", "")
+        if not ADMIN_TOKEN or not hmac.compare_digest(token, ADMIN_TOKEN):
+            return jsonify({"error": "Admin token required"}), 403
+
+        url = request.form.get("url") or (request.get_json(silent=True) or {}).get(
+            "url"
+        )
+        if not url:
+            return jsonify({"error": "No shard url"}), 400
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            return jsonify({"error": f"Invalid shard url: {url}"}), 400
+        try:
+            moved = master_client.add_shard(url)
+            return jsonify({"shard": url, "videos_moved": moved}), 201
+        except Exception as e:
+            logger.error(f"Adding shard {url} failed: {e}")
+            return jsonify({"error": str(e)}), 500
+
+    return jsonify(
+        [
+            {"url": url, "connected": connected}
+            for url, connected in master_client.shard_status.items()
+        ]
+    )
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Video service admin console")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--debug", action=argparse.BooleanOptionalAction, default=True)
+    args = parser.parse_args()
+
     logger.add("flask_app.log", serialize=True, rotation="10 MB")
     os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-    app.run(host="0.0.0.0", port=5000, debug=True)
+    app.run(host=args.host, port=args.port, debug=args.debug, threaded=True)
@@ -0,0 +1,109 @@
+#!/usr/bin/python3
+"""Benchmark chunk sizing and compression.
+
+Compares the old fixed 10 MB chunks against adaptive sizing, with and
+without per-chunk compression, on incompressible (video-like) and
+compressible (sidecar-like) files. Reports chunking throughput, chunk count
+and the XML-RPC size of the per-video chunk metadata sent to the master.
+
+    python bench_chunking.py --sizes 1 64 512 --servers 3
+"""
+import argparse
+import os
+import tempfile
+import time
+import uuid
+import xmlrpc.client
+
+from chunking import MB, chunk_file, choose_chunk_size, resolve_codec
+
+
+def make_file(directory, size, compressible):
+    path = os.path.join(directory, f"{'text' if compressible else 'video'}_{size}")
+    line = b"00:00:01.000 --> 00:00:02.000 frame=42 bitrate=8000kbps\n"
+
+    with open(path, "wb") as f:
+        written = 0
+        while written < size:
+            block = min(MB, size - written)
+            if compressible:
+                f.write((line * (block // len(line) + 1))[:block])
+            else:
+                f.write(os.urandom(block))
+            written += block
+    return path
+
+
+def metadata_size(chunks):
+    metadata = {
+        "chunk_count": len(chunks),
+        "chunk_ids": [c["chunk_id"] for c in chunks],
+        "chunk_servers": [f"chunk_server_{c['sequence'] % 3}" for c in chunks],
+        "chunk_codecs": [c["codec"] for c in chunks],
+    }
+    return len(xmlrpc.client.dumps((metadata,)))
+
+
+def run(path, chunk_size, servers, codec):
+    start = time.perf_counter()
+    chunks = chunk_file(
+        path,
+        chunk_size=chunk_size,
+        server_count=servers,
+        codec=codec,
+        chunk_prefix=f"vid_{uuid.uuid4().hex[:12]}",  # as the app names chunks
+    )
+    elapsed = time.perf_counter() - start
+
+    size = sum(c["size"] for c in chunks)
+    stored = sum(c["stored_size"] for c in chunks)
+    return {
+        "chunks": len(chunks),
+        "mb_per_s": size / MB / elapsed,
+        "ratio": stored / size,
+        "metadata_bytes": metadata_size(chunks),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 64, 512])
+    parser.add_argument("--servers", type=int, default=3)
+    parser.add_argument("--codecs", nargs="+", default=["none", "zstd", "lz4", "zlib"])
+    args = parser.parse_args()
+
+    codecs = []
+    for codec in args.codecs:
+        resolved = resolve_codec(codec)
+        if resolved not in codecs:
+            codecs.append(resolved)
+        if resolved != codec:
+            print(f"{codec} not installed, using {resolved}")
+
+    print(
+        f"{'data':<6} {'MB':>5} {'chunking':<16} {'codec':<6} {'chunks':>6} "
+        f"{'MB/s':>8} {'ratio':>6} {'meta B':>7}"
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        for size_mb in args.sizes:
+            for compressible in (False, True):
+                path = make_file(directory, size_mb * MB, compressible)
+                adaptive = choose_chunk_size(size_mb * MB, args.servers)
+
+                for label, chunk_size in (
+                    ("fixed 10MB", 10 * MB),
+                    (f"adaptive {adaptive // MB}MB", None),
+                ):
+                    for codec in codecs:
+                        result = run(path, chunk_size, args.servers, codec)
+                        print(
+                            f"{'text' if compressible else 'video':<6} {size_mb:>5} "
+                            f"{label:<16} {codec:<6} {result['chunks']:>6} "
+                            f"{result['mb_per_s']:>8.1f} {result['ratio']:>6.2f} "
+                            f"{result['metadata_bytes']:>7}"
+                        )
+                os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+#!/usr/bin/python3
+"""Benchmark process startup time for horizontal scaling.
+
+Measures how long it takes to import app.py and for a master shard, a chunk
+server and the Flask app to go from process spawn to serving requests. The
+app is pointed at a hung master (a socket that accepts connections but never
+answers) so any blocking call to the master during startup shows up. For the
+app, the first dashboard view and the first /api/metrics call are timed too,
+since those are the requests that have to reach the master.
+
+    python bench_startup.py --runs 5
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+import xmlrpc.client
+
+from cluster_harness import HERE, free_port, wait_until
+
+STARTUP_TIMEOUT = 10
+POLL_INTERVAL = 0.005
+
+
+def spawn(workdir, script, *args, env=None):
+    return subprocess.Popen(
+        [sys.executable, os.path.join(HERE, script), *map(str, args)],
+        cwd=workdir,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        env={**os.environ, **(env or {})},
+    )
+
+
+def stop(process):
+    process.terminate()
+    try:
+        process.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def time_app_import(workdir, master_url):
+    started = time.perf_counter()
+    try:
+        subprocess.run(
+            [sys.executable, "-c", "import app"],
+            cwd=HERE,
+            env={**os.environ, "MASTER_SERVER_URLS": master_url},
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            check=True,
+            timeout=STARTUP_TIMEOUT,
+        )
+    except subprocess.TimeoutExpired:
+        return float("inf")
+    return time.perf_counter() - started
+
+
+def time_master(workdir):
+    port = free_port()
+    started = time.perf_counter()
+    process = spawn(workdir, "master_server.py", "--port", port)
+    try:
+        master = xmlrpc.client.ServerProxy(f"http://localhost:{port}")
+        wait_until(lambda: master.ping() == "pong", 10, "master", POLL_INTERVAL)
+        return time.perf_counter() - started
+    finally:
+        stop(process)
+
+
+def time_chunk_server(workdir, master_url, run):
+    port = free_port()
+    server_id = f"bench_chunk_server_{run}"
+    master = xmlrpc.client.ServerProxy(master_url)
+
+    started = time.perf_counter()
+    process = spawn(
+        workdir,
+        "chunk_server.py",
+        "--count",
+        1,
+        "--server-id",
+        server_id,
+        "--port",
+        port,
+        "--master",
+        master_url,
+    )
+    try:
+        # Ready once it serves chunks and the master has its first heartbeat
+        proxy = xmlrpc.client.ServerProxy(f"http://localhost:{port}")
+        wait_until(
+            lambda: proxy.ping() == "pong", 10, "chunk server", POLL_INTERVAL
+        )
+        wait_until(
+            lambda: any(s["id"] == server_id for s in master.get_chunk_servers()),
+            10,
+            "chunk server heartbeat",
+            POLL_INTERVAL,
+        )
+        return time.perf_counter() - started
+    finally:
+        stop(process)
+
+
+def time_request(url):
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url, timeout=STARTUP_TIMEOUT) as response:
+            response.read()
+    except OSError:  # Includes the timeout of a request stuck on the master
+        return float("inf")
+    return time.perf_counter() - started
+
+
+def time_app(workdir, master_url):
+    """Return (startup, first page view, first metrics call) in seconds."""
+    port = free_port()
+    started = time.perf_counter()
+    process = spawn(
+        workdir,
+        "app.py",
+        "--port",
+        port,
+        "--host",
+        "localhost",
+        "--no-debug",
+        env={"MASTER_SERVER_URLS": master_url},
+    )
+    try:
+        base = f"http://localhost:{port}"
+        try:
+            wait_until(
+                lambda: urllib.request.urlopen(f"{base}/api/uploads").status == 200,
+                STARTUP_TIMEOUT,
+                "app",
+                POLL_INTERVAL,
+            )
+        except TimeoutError:
+            return float("inf"), float("inf"), float("inf")
+        startup = time.perf_counter() - started
+        return startup, time_request(f"{base}/"), time_request(f"{base}/api/metrics")
+    finally:
+        stop(process)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    results = {
+        "app import": [],
+        "master": [],
+        "chunk server": [],
+        "flask app": [],
+        "first page": [],
+        "first metrics": [],
+    }
+
+    with tempfile.TemporaryDirectory() as workdir, socket.socket() as hung:
+        # Accepts connections (via the backlog) but never responds
+        hung.bind(("localhost", 0))
+        hung.listen(128)
+        unreachable = f"http://localhost:{hung.getsockname()[1]}"
+        master_port = free_port()
+        master_url = f"http://localhost:{master_port}"
+        master = spawn(workdir, "master_server.py", "--port", master_port)
+
+        try:
+            proxy = xmlrpc.client.ServerProxy(master_url)
+            wait_until(lambda: proxy.ping() == "pong", 10, "master", POLL_INTERVAL)
+
+            for run in range(args.runs):
+                results["app import"].append(time_app_import(workdir, unreachable))
+                results["master"].append(time_master(workdir))
+                results["chunk server"].append(
+                    time_chunk_server(workdir, master_url, run)
+                )
+                startup, page, metrics = time_app(workdir, unreachable)
+                results["flask app"].append(startup)
+                results["first page"].append(page)
+                results["first metrics"].append(metrics)
+        finally:
+            stop(master)
+
+    print(f"{'process':<14} {'median ms':>10} {'min ms':>8} {'max ms':>8}")
+    for name, samples in results.items():
+        print(
+            f"{name:<14} {statistics.median(samples) * 1000:>10.0f} "
+            f"{min(samples) * 1000:>8.0f} {max(samples) * 1000:>8.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
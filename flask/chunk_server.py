@@ -1,55 +1,177 @@
 #!/usr/bin/python3
 import xmlrpc.client
+import argparse
 import time
 import threading
 from loguru import logger
+import os
 import random
 
 
 class ChunkServer:
-    def __init__(self, server_id, master_url):
+    def __init__(
+        self,
+        server_id,
+        master_url,
+        host="localhost",
+        port=None,
+        data_dir=None,
+        heartbeat_interval=30,
+        disk_delay=0,
+    ):
         self.server_id = server_id
         self.master_url = master_url
         self.master = xmlrpc.client.ServerProxy(master_url)
 
+        self.host = host
+        self.port = port
+        self.data_dir = data_dir or os.path.join("chunk_data", server_id)
+        self.heartbeat_interval = heartbeat_interval
+        # Seconds added to every chunk read/write to simulate a slow disk
+        self.disk_delay = disk_delay
+
         self.stored_chunks = set()
         self.running = False
+        self.server = None
         logger.info(f"Chunk Server {server_id} initialized")
 
+    @property
+    def address(self):
+        if self.port is None:
+            return None
+        return f"http://{self.host}:{self.port}"
+
+    def _chunk_path(self, chunk_id):
+        return os.path.join(self.data_dir, os.path.basename(chunk_id))
+
+    def ping(self):
+        return "pong"
+
+    def server_info(self):
+        return {
+            "load": random.uniform(0.1, 0.8),
+            "storage_used_gb": random.uniform(10, 100),
+            "chunk_count": len(self.stored_chunks),
+            "version": "1.0",
+            "address": self.address,
+        }
+
+    def set_disk_delay(self, delay):
+        # Lets a test harness inject a slow disk into a running server
+        self.disk_delay = delay
+        logger.info(f"Disk delay set to {delay}s")
+        return True
+
+    def store_chunk(self, chunk_id, data):
+        time.sleep(self.disk_delay)
+        with open(self._chunk_path(chunk_id), "wb") as f:
+            f.write(data.data)
+
+        self.stored_chunks.add(chunk_id)
+        logger.debug(f"Stored chunk {chunk_id}", size=len(data.data))
+        return True
+
+    def get_chunk(self, chunk_id):
+        if chunk_id not in self.stored_chunks:
+            return None
+
+        time.sleep(self.disk_delay)
+        with open(self._chunk_path(chunk_id), "rb") as f:
+            return xmlrpc.client.Binary(f.read())
+
+    def delete_chunk(self, chunk_id):
+        if chunk_id not in self.stored_chunks:
+            return False
+
+        self.stored_chunks.discard(chunk_id)
+        try:
+            os.remove(self._chunk_path(chunk_id))
+        except FileNotFoundError:
+            pass
+        logger.debug(f"Deleted chunk {chunk_id}")
+        return True
+
+    def start_rpc_server(self):
+        # Deferred so heartbeat-only chunk servers never import http.server
+        from xmlrpc.server import SimpleXMLRPCServer
+        import socketserver
+
+        class ThreadedXMLRPCServer(socketserver.ThreadingMixIn, SimpleXMLRPCServer):
+            daemon_threads = True
+
+        os.makedirs(self.data_dir, exist_ok=True)
+
+        self.server = ThreadedXMLRPCServer(
+            (self.host, self.port), logRequests=False, allow_none=True
+        )
+        self.server.register_function(self.ping)
+        self.server.register_function(self.store_chunk)
+        self.server.register_function(self.get_chunk)
+        self.server.register_function(self.delete_chunk)
+        self.server.register_function(self.server_info)
+        self.server.register_function(self.set_disk_delay)
+
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        logger.info(f"Chunk RPC server listening on {self.address}")
+
     def start_heartbeat(self):
         self.running = True
 
         def heartbeat_loop():
             while self.running:
                 try:
-                    server_info = {
-                        "load": random.uniform(0.1, 0.8),
-                        "storage_used_gb": random.uniform(10, 100),
-                        "chunk_count": len(self.stored_chunks),
-                        "version": "1.0",
-                    }
-
-                    response = self.master.heartbeat(self.server_id, server_info)
+                    response = self.master.heartbeat(
+                        self.server_id, self.server_info()
+                    )
                     logger.debug(f"Heartbeat acknowledged: {response}")
 
                 except Exception as e:
                     logger.error(f"Heartbeat failed: {e}")
 
-                time.sleep(30)
+                time.sleep(self.heartbeat_interval)
 
         threading.Thread(target=heartbeat_loop, daemon=True).start()
         logger.info("Heartbeat loop started")
 
     def stop(self):
         self.running = False
+        if self.server is not None:
+            self.server.shutdown()
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chunk servers")
+    parser.add_argument("--master", default="http://localhost:8000")
+    parser.add_argument("--count", type=int, default=3)
+    parser.add_argument("--server-id", help="id of the first server")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument(
+        "--port", type=int, help="serve chunks over XML-RPC from this port up"
+    )
+    parser.add_argument("--data-dir", default="chunk_data")
+    parser.add_argument("--heartbeat-interval", type=float, default=30)
+    parser.add_argument("--disk-delay", type=float, default=0)
+    args = parser.parse_args()
+
     logger.add("chunk_server.log", serialize=True)
 
     servers = []
-    for i in range(3):
-        server = ChunkServer(f"chunk_server_{i}", "http://localhost:8000")
+    for i in range(args.count):
+        server_id = f"chunk_server_{i}"
+        if args.server_id:
+            server_id = args.server_id if args.count == 1 else f"{args.server_id}_{i}"
+
+        server = ChunkServer(
+            server_id,
+            args.master,
+            host=args.host,
+            port=args.port + i if args.port else None,
+            data_dir=os.path.join(args.data_dir, server_id),
+            heartbeat_interval=args.heartbeat_interval,
+            disk_delay=args.disk_delay,
+        )
+        if server.port is not None:
+            server.start_rpc_server()
         server.start_heartbeat()
         servers.append(server)
 
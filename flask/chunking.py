@@ -0,0 +1,124 @@
+#!/usr/bin/python3
+import importlib
+import os
+import zlib
+
+MB = 1024 * 1024
+MIN_CHUNK_SIZE = 1 * MB
+MAX_CHUNK_SIZE = 64 * MB
+CHUNKS_PER_SERVER = 4  # enough chunks to keep every chunk server busy
+
+# Compressed chunks are only kept when they save at least this fraction
+MIN_COMPRESSION_SAVING = 0.1
+COMPRESSION_PROBE_SIZE = 64 * 1024
+
+
+def choose_chunk_size(file_size, server_count=1):
+    """Pick a power-of-two chunk size from the file size and cluster fan-out.
+
+    Small files become a single chunk instead of several tiny RPCs; large
+    files are capped at MAX_CHUNK_SIZE so chunk metadata stays small.
+    """
+    target = file_size // (max(server_count, 1) * CHUNKS_PER_SERVER)
+    chunk_size = MIN_CHUNK_SIZE
+    while chunk_size < target and chunk_size < MAX_CHUNK_SIZE:
+        chunk_size *= 2
+    return chunk_size
+
+
+def _zlib_codec():
+    return lambda data: zlib.compress(data, 1)
+
+
+def _zstd_codec():
+    zstandard = importlib.import_module("zstandard")
+    # zstd contexts are not thread-safe; upload workers each get their own
+    return lambda data: zstandard.ZstdCompressor(level=1).compress(data)
+
+
+def _lz4_codec():
+    return importlib.import_module("lz4.frame").compress
+
+
+CODECS = {
+    "zstd": _zstd_codec,
+    "lz4": _lz4_codec,
+    "zlib": _zlib_codec,
+}
+_loaded_codecs = {}
+
+
+def _codec(name):
+    if name not in _loaded_codecs:
+        _loaded_codecs[name] = CODECS[name]()
+    return _loaded_codecs[name]
+
+
+def resolve_codec(name):
+    """Return the codec actually used for ``name``.
+
+    zstd and lz4 are optional dependencies; when they are not installed the
+    stdlib zlib codec (level 1) is used instead.
+    """
+    if not name or name == "none":
+        return "none"
+    if name not in CODECS:
+        raise ValueError(f"Unknown compression codec: {name}")
+
+    try:
+        _codec(name)
+    except ImportError:
+        return "zlib"
+    return name
+
+
+def compress_chunk(data, codec):
+    if codec == "none":
+        return data, "none"
+
+    compress = _codec(codec)
+
+    # Probe a small prefix first so incompressible chunks cost almost nothing
+    probe = data[:COMPRESSION_PROBE_SIZE]
+    if len(data) > len(probe) and len(compress(probe)) > len(probe) * (
+        1 - MIN_COMPRESSION_SAVING
+    ):
+        return data, "none"
+
+    compressed = compress(data)
+    if len(compressed) > len(data) * (1 - MIN_COMPRESSION_SAVING):
+        return data, "none"  # Incompressible (e.g. already-encoded video)
+    return compressed, codec
+
+
+def chunk_file(
+    file_path, chunk_size=None, server_count=1, codec="none", chunk_prefix=None
+):
+    # Chunk ids must be unique cluster-wide, so callers pass the video id
+    chunk_prefix = chunk_prefix or os.path.basename(file_path)
+    if chunk_size is None:
+        chunk_size = choose_chunk_size(os.path.getsize(file_path), server_count)
+    codec = resolve_codec(codec)
+
+    chunks = []
+    chunk_id = 0
+
+    with open(file_path, "rb") as f:
+        while True:
+            chunk_data = f.read(chunk_size)
+            if not chunk_data:
+                break
+
+            stored_data, chunk_codec = compress_chunk(chunk_data, codec)
+            chunk_info = {
+                "chunk_id": f"{chunk_prefix}_{chunk_id}",
+                "data": stored_data,
+                "size": len(chunk_data),
+                "stored_size": len(stored_data),
+                "codec": chunk_codec,
+                "sequence": chunk_id,
+            }
+            chunks.append(chunk_info)
+            chunk_id += 1
+
+    return chunks
@@ -0,0 +1,530 @@
+#!/usr/bin/python3
+"""Local multi-process cluster harness for end-to-end scale testing.
+
+Starts master shard(s), N chunk servers and the Flask app as local processes
+on ephemeral ports, drives an upload/stream/heartbeat workload against them,
+optionally injects failures mid-run (a killed chunk server, a slow disk),
+and reports throughput, latency percentiles and recovery time.
+
+    python cluster_harness.py --chunk-servers 5 --duration 30 \\
+        --upload-concurrency 4 --kill-after 10 \\
+        --slow-disk-after 5 --slow-disk-delay 0.2
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+import uuid
+import xmlrpc.client
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("localhost", 0))
+        return s.getsockname()[1]
+
+
+def wait_until(check, timeout, what, interval=0.05):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if check():
+                return
+        except Exception:
+            pass
+        time.sleep(interval)
+    raise TimeoutError(f"Timed out waiting for {what}")
+
+
+def percentiles(samples):
+    if not samples:
+        return {"count": 0}
+
+    ordered = sorted(samples)
+
+    def pick(q):
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    return {
+        "count": len(ordered),
+        "p50_ms": pick(0.50) * 1000,
+        "p95_ms": pick(0.95) * 1000,
+        "p99_ms": pick(0.99) * 1000,
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+def format_seconds(value):
+    return "n/a" if value is None else f"{value:.2f}s"
+
+
+def encode_multipart(fields, file_field, filename, data):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"'
+            f"\r\n\r\n{value}\r\n".encode()
+        )
+    parts.append(
+        f'--{boundary}\r\nContent-Disposition: form-data; name="{file_field}"; '
+        f'filename="{filename}"\r\nContent-Type: video/mp4\r\n\r\n'.encode()
+        + data
+        + b"\r\n"
+    )
+    parts.append(f"--{boundary}--\r\n".encode())
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+class Cluster:
+    def __init__(
+        self,
+        workdir,
+        masters=1,
+        chunk_servers=3,
+        heartbeat_interval=1.0,
+        heartbeat_timeout=5.0,
+    ):
+        self.workdir = workdir
+        self.master_count = masters
+        self.chunk_server_count = chunk_servers
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = heartbeat_timeout
+
+        self.master_urls = []
+        self.chunk_servers = {}  # server_id -> (process, address)
+        self.app_url = None
+        self.processes = []
+
+    def _spawn(self, name, script, *args, env=None):
+        log = open(os.path.join(self.workdir, f"{name}.out"), "w")
+        process = subprocess.Popen(
+            [sys.executable, os.path.join(HERE, script), *map(str, args)],
+            cwd=self.workdir,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+            env={**os.environ, **(env or {})},
+        )
+        self.processes.append(process)
+        return process
+
+    def start(self):
+        started = time.time()
+
+        for i in range(self.master_count):
+            port = free_port()
+            self._spawn(
+                f"master_{i}",
+                "master_server.py",
+                "--port",
+                port,
+                "--shard-id",
+                f"master_{i}",
+                "--heartbeat-timeout",
+                self.heartbeat_timeout,
+            )
+            self.master_urls.append(f"http://localhost:{port}")
+
+        for url in self.master_urls:
+            master = xmlrpc.client.ServerProxy(url)
+            wait_until(lambda: master.ping() == "pong", 10, url)
+
+        for i in range(self.chunk_server_count):
+            server_id = f"chunk_server_{i}"
+            port = free_port()
+            process = self._spawn(
+                server_id,
+                "chunk_server.py",
+                "--count",
+                1,
+                "--server-id",
+                server_id,
+                "--port",
+                port,
+                "--master",
+                self.master_urls[i % len(self.master_urls)],
+                "--heartbeat-interval",
+                self.heartbeat_interval,
+            )
+            self.chunk_servers[server_id] = (process, f"http://localhost:{port}")
+
+        wait_until(
+            lambda: len(self.live_chunk_servers()) == self.chunk_server_count,
+            10 + self.heartbeat_interval,
+            "chunk server heartbeats",
+        )
+
+        port = free_port()
+        self._spawn(
+            "app",
+            "app.py",
+            "--port",
+            port,
+            "--host",
+            "localhost",
+            "--no-debug",
+            env={"MASTER_SERVER_URLS": ",".join(self.master_urls)},
+        )
+        self.app_url = f"http://localhost:{port}"
+        wait_until(
+            lambda: urllib.request.urlopen(f"{self.app_url}/api/uploads").status
+            == 200,
+            20,
+            "flask app",
+        )
+
+        return time.time() - started
+
+    def live_chunk_servers(self):
+        servers = {}
+        for url in self.master_urls:
+            for server in xmlrpc.client.ServerProxy(url).get_chunk_servers():
+                servers[server["id"]] = server["info"].get("address")
+        return servers
+
+    def slow_down_chunk_server(self, server_id, delay):
+        _, address = self.chunk_servers[server_id]
+        xmlrpc.client.ServerProxy(address).set_disk_delay(delay)
+        return time.time()
+
+    def kill_chunk_server(self, server_id):
+        process, _ = self.chunk_servers[server_id]
+        process.kill()
+        process.wait()
+        return time.time()
+
+    def stop(self):
+        for process in reversed(self.processes):
+            if process.poll() is None:
+                process.terminate()
+        for process in self.processes:
+            try:
+                process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+class Workload:
+    def __init__(self, cluster, args):
+        self.cluster = cluster
+        self.args = args
+        self.payload = os.urandom(int(args.file_size_mb * 1024 * 1024))
+
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.counter = 0
+
+        self.videos = []
+        self.upload_latencies = []
+        self.upload_completions = []  # (finished_at, bytes)
+        self.upload_failures = 0
+        self.stream_latencies = []
+        self.stream_bytes = 0
+        self.stream_failures = 0
+        self.heartbeat_latencies = []
+
+        self.kill_time = None
+        self.detection_time = None
+        self.started = None
+        self.slow_disk_time = None
+        self.slow_disk_server = None
+        self.upload_recovery_time = None
+
+    def _next_id(self):
+        with self.lock:
+            self.counter += 1
+            return self.counter
+
+    def upload_loop(self):
+        while not self.stop_event.is_set():
+            n = self._next_id()
+            body, content_type = encode_multipart(
+                {"title": f"harness video {n}", "compression": "none"},
+                "video",
+                "harness.mp4",  # Same name every time, as real clients would
+                self.payload,
+            )
+            submitted = time.time()
+            try:
+                request = urllib.request.Request(
+                    f"{self.cluster.app_url}/upload",
+                    data=body,
+                    headers={"Content-Type": content_type},
+                )
+                with urllib.request.urlopen(request) as response:
+                    job_id = json.load(response)["job_id"]
+
+                job = self._wait_for_job(job_id)
+            except Exception:
+                job = {"status": "failed"}
+
+            finished = time.time()
+            with self.lock:
+                if job["status"] == "completed":
+                    self.upload_latencies.append(finished - submitted)
+                    self.upload_completions.append((finished, len(self.payload)))
+                    self.videos.append(f"vid_{job_id}")
+                    if (
+                        self.kill_time
+                        and submitted >= self.kill_time
+                        and self.upload_recovery_time is None
+                    ):
+                        self.upload_recovery_time = finished - self.kill_time
+                else:
+                    self.upload_failures += 1
+
+    def _wait_for_job(self, job_id):
+        while True:
+            url = f"{self.cluster.app_url}/api/uploads/{job_id}"
+            with urllib.request.urlopen(url) as response:
+                job = json.load(response)
+            if job["status"] in ("completed", "failed"):
+                return job
+            time.sleep(0.05)
+
+    def stream_loop(self):
+        addresses = {}
+        while not self.stop_event.is_set():
+            with self.lock:
+                video_id = random.choice(self.videos) if self.videos else None
+            if video_id is None:
+                time.sleep(0.1)
+                continue
+
+            try:
+                url = f"{self.cluster.app_url}/api/videos/{video_id}"
+                with urllib.request.urlopen(url) as response:
+                    video = json.load(response)
+
+                for chunk_id, server_id in zip(
+                    video["chunk_ids"], video["chunk_servers"]
+                ):
+                    if server_id not in addresses:
+                        addresses.update(self.cluster.live_chunk_servers())
+
+                    started = time.time()
+                    proxy = xmlrpc.client.ServerProxy(addresses[server_id])
+                    chunk = proxy.get_chunk(chunk_id)
+                    with self.lock:
+                        self.stream_latencies.append(time.time() - started)
+                        self.stream_bytes += len(chunk.data)
+            except Exception:
+                with self.lock:
+                    self.stream_failures += 1
+
+    def heartbeat_loop(self):
+        # Extra heartbeats on behalf of live chunk servers, on top of their own
+        interval = 1.0 / self.args.heartbeat_rate
+        masters = [xmlrpc.client.ServerProxy(url) for url in self.cluster.master_urls]
+        while not self.stop_event.is_set():
+            for i, (server_id, (process, address)) in enumerate(
+                self.cluster.chunk_servers.items()
+            ):
+                if process.poll() is not None:
+                    continue
+
+                try:
+                    # Send the server's real info so the master's view
+                    # (chunk_count, version) stays accurate
+                    info = xmlrpc.client.ServerProxy(address).server_info()
+                except Exception:
+                    continue
+
+                started = time.time()
+                try:
+                    masters[i % len(masters)].heartbeat(server_id, info)
+                    with self.lock:
+                        self.heartbeat_latencies.append(time.time() - started)
+                except Exception:
+                    pass
+                time.sleep(interval)
+
+    def slow_disk_loop(self):
+        if self.stop_event.wait(self.args.slow_disk_after):
+            return
+
+        # The last server gets the slow disk so kill tests hit a healthy one
+        server_id = f"chunk_server_{self.cluster.chunk_server_count - 1}"
+        self.slow_disk_time = self.cluster.slow_down_chunk_server(
+            server_id, self.args.slow_disk_delay
+        )
+        self.slow_disk_server = server_id
+        print(f"[HARNESS] Slowed {server_id} disk to {self.args.slow_disk_delay}s")
+
+    def failure_loop(self):
+        if self.stop_event.wait(self.args.kill_after):
+            return
+
+        server_id = "chunk_server_0"
+        self.kill_time = self.cluster.kill_chunk_server(server_id)
+        print(f"[HARNESS] Killed {server_id}")
+
+        while not self.stop_event.is_set():
+            try:
+                if server_id not in self.cluster.live_chunk_servers():
+                    self.detection_time = time.time() - self.kill_time
+                    print(f"[HARNESS] Master dropped {server_id}")
+                    return
+            except Exception:
+                pass
+            time.sleep(0.1)
+
+    def run(self):
+        threads = [
+            threading.Thread(target=self.upload_loop)
+            for _ in range(self.args.upload_concurrency)
+        ]
+        threads += [
+            threading.Thread(target=self.stream_loop)
+            for _ in range(self.args.stream_concurrency)
+        ]
+        if self.args.heartbeat_rate > 0:
+            threads.append(threading.Thread(target=self.heartbeat_loop))
+        if self.args.kill_after is not None:
+            threads.append(threading.Thread(target=self.failure_loop))
+        if self.args.slow_disk_delay > 0:
+            threads.append(threading.Thread(target=self.slow_disk_loop))
+
+        started = self.started = time.time()
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+
+        time.sleep(self.args.duration)
+        self.stop_event.set()
+        for thread in threads:
+            thread.join(timeout=30)
+
+        return time.time() - started
+
+    def report(self, elapsed, startup_time):
+        uploaded = sum(size for _, size in self.upload_completions)
+        return {
+            "startup_s": startup_time,
+            "duration_s": elapsed,
+            "uploads": {
+                "completed": len(self.upload_completions),
+                "failed": self.upload_failures,
+                "throughput_mbps": uploaded / elapsed / (1024**2),
+                "latency": percentiles(self.upload_latencies),
+            },
+            "streams": {
+                "chunks": len(self.stream_latencies),
+                "failed": self.stream_failures,
+                "throughput_mbps": self.stream_bytes / elapsed / (1024**2),
+                "latency": percentiles(self.stream_latencies),
+            },
+            "heartbeats": {"latency": percentiles(self.heartbeat_latencies)},
+            "failure": {
+                "killed": self.kill_time is not None,
+                "detection_s": self.detection_time,
+                "upload_recovery_s": self.upload_recovery_time,
+                "slow_disk_server": self.slow_disk_server,
+                "slow_disk_at_s": (
+                    self.slow_disk_time - self.started if self.slow_disk_time else None
+                ),
+            },
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--masters", type=int, default=1)
+    parser.add_argument("--chunk-servers", type=int, default=3)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--upload-concurrency", type=int, default=2)
+    parser.add_argument("--stream-concurrency", type=int, default=2)
+    parser.add_argument("--file-size-mb", type=float, default=4)
+    parser.add_argument(
+        "--heartbeat-rate", type=float, default=10, help="extra heartbeats/s"
+    )
+    parser.add_argument("--heartbeat-interval", type=float, default=1)
+    parser.add_argument("--heartbeat-timeout", type=float, default=5)
+    parser.add_argument(
+        "--kill-after", type=float, help="kill chunk_server_0 after N seconds"
+    )
+    parser.add_argument(
+        "--slow-disk-delay",
+        type=float,
+        default=0,
+        help="per-operation disk delay injected into the last chunk server",
+    )
+    parser.add_argument(
+        "--slow-disk-after",
+        type=float,
+        default=0,
+        help="inject the slow disk after N seconds",
+    )
+    parser.add_argument("--workdir", help="keep process logs and data here")
+    parser.add_argument("--json", action="store_true", help="print a JSON report")
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="cluster_harness_")
+    os.makedirs(workdir, exist_ok=True)
+
+    cluster = Cluster(
+        workdir,
+        masters=args.masters,
+        chunk_servers=args.chunk_servers,
+        heartbeat_interval=args.heartbeat_interval,
+        heartbeat_timeout=args.heartbeat_timeout,
+    )
+
+    try:
+        startup_time = cluster.start()
+        print(f"[HARNESS] Cluster up in {startup_time:.2f}s (logs in {workdir})")
+
+        workload = Workload(cluster, args)
+        elapsed = workload.run()
+        report = workload.report(elapsed, startup_time)
+    finally:
+        cluster.stop()
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    uploads, streams = report["uploads"], report["streams"]
+    print(
+        f"Uploads:    {uploads['completed']} ok, {uploads['failed']} failed, "
+        f"{uploads['throughput_mbps']:.1f} MB/s"
+    )
+    print(
+        f"Streams:    {streams['chunks']} chunks, {streams['failed']} failed, "
+        f"{streams['throughput_mbps']:.1f} MB/s"
+    )
+    for name, latency in (
+        ("Upload", uploads["latency"]),
+        ("Chunk read", streams["latency"]),
+        ("Heartbeat", report["heartbeats"]["latency"]),
+    ):
+        if latency["count"]:
+            print(
+                f"{name + ' ms':<16} p50={latency['p50_ms']:.1f} "
+                f"p95={latency['p95_ms']:.1f} p99={latency['p99_ms']:.1f} "
+                f"max={latency['max_ms']:.1f}"
+            )
+    failure = report["failure"]
+    if failure["slow_disk_server"]:
+        print(
+            f"Slow disk:  {failure['slow_disk_server']} from "
+            f"{format_seconds(failure['slow_disk_at_s'])}"
+        )
+    if failure["killed"]:
+        print(
+            f"Recovery:   detected in {format_seconds(failure['detection_s'])}, "
+            f"uploads recovered in {format_seconds(failure['upload_recovery_s'])}"
+        )
+
+
+if __name__ == "__main__":
+    main()
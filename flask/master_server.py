@@ -4,22 +4,30 @@ from loguru import logger
 import time
 import threading
 from collections import defaultdict
+import argparse
 
 
 class MasterServer:
-    def __init__(self, host="localhost", port=8000):
+    def __init__(
+        self, host="localhost", port=8000, shard_id="master_0", heartbeat_timeout=60
+    ):
         self.server = SimpleXMLRPCServer(
             (host, port), logRequests=False, allow_none=True
         )
+        self.shard_id = shard_id
+        # Seconds without a heartbeat before a chunk server is considered dead
+        self.heartbeat_timeout = heartbeat_timeout
 
         # System state
         self.chunk_servers = {}
         self.videos = {}
         self.uploads_today = 0
         self.last_reset = time.time()
+        # Shard list shared by every app process; updated by compare-and-set
+        self.shard_map = {"version": 0, "shards": []}
 
         self.setup_methods()
-        logger.info(f"Master Server initialized on {host}:{port}")
+        logger.info(f"Master Server {shard_id} initialized on {host}:{port}")
 
     def setup_methods(self):
         self.server.register_function(self.ping)
@@ -30,6 +38,10 @@ class MasterServer:
         self.server.register_function(self.register_chunk)
         self.server.register_function(self.list_videos)
         self.server.register_function(self.get_video_details)
+        self.server.register_function(self.import_videos)
+        self.server.register_function(self.drop_videos)
+        self.server.register_function(self.get_shard_map)
+        self.server.register_function(self.set_shard_map)
 
     def ping(self):
         return "pong"
@@ -71,19 +83,21 @@ class MasterServer:
         active_servers = sum(
             1
             for s in self.chunk_servers.values()
-            if time.time() - s["last_heartbeat"] < 60
+            if time.time() - s["last_heartbeat"] < self.heartbeat_timeout
         )
 
-        total_storage_gb = sum(v["total_size"] for v in self.videos.values()) / (
-            1024**3
-        )
+        total_storage_bytes = sum(v["total_size"] for v in self.videos.values())
+        total_storage_gb = total_storage_bytes / (1024**3)
 
         return {
             "connected": True,
+            "shard_id": self.shard_id,
             "active_servers": active_servers,
             "total_videos": len(self.videos),
             "uploads_today": self.uploads_today,
             "total_storage": f"{total_storage_gb:.2f} GB",
+            # float: XML-RPC integers are limited to 32 bits
+            "total_storage_bytes": float(total_storage_bytes),
             "health": "healthy" if active_servers > 0 else "degraded",
             "timestamp": time.time(),
         }
@@ -93,7 +107,7 @@ class MasterServer:
         current_time = time.time()
 
         for server_id, server_data in self.chunk_servers.items():
-            if current_time - server_data["last_heartbeat"] < 60:
+            if current_time - server_data["last_heartbeat"] < self.heartbeat_timeout:
                 active_servers.append(
                     {
                         "id": server_id,
@@ -134,12 +148,56 @@ class MasterServer:
             return self.videos[video_id]
         return None
 
+    def import_videos(self, videos):
+        # Used when rebalancing shards: moved videos do not count as new uploads
+        for video_data in videos:
+            self.videos[video_data["video_id"]] = video_data
+
+        logger.info("Videos imported", shard_id=self.shard_id, count=len(videos))
+        return len(videos)
+
+    def drop_videos(self, video_ids):
+        dropped = 0
+        for video_id in video_ids:
+            if self.videos.pop(video_id, None) is not None:
+                dropped += 1
+
+        logger.info("Videos dropped", shard_id=self.shard_id, count=dropped)
+        return dropped
+
+    def get_shard_map(self):
+        return self.shard_map
+
+    def set_shard_map(self, shard_map, expected_version):
+        # Rejected if another app process already published a newer map
+        if self.shard_map["version"] > expected_version:
+            return False
+
+        self.shard_map = shard_map
+        logger.info(
+            "Shard map updated",
+            version=shard_map["version"],
+            shards=shard_map["shards"],
+        )
+        return True
+
     def serve_forever(self):
         logger.info("Starting XML-RPC master server...")
         self.server.serve_forever()
 
 
 if __name__ == "__main__":
-    logger.add("master_server.log", serialize=True, rotation="10 MB")
-    server = MasterServer()
+    parser = argparse.ArgumentParser(description="Video metadata master shard")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--shard-id", default="master_0")
+    parser.add_argument("--heartbeat-timeout", type=float, default=60)
+    args = parser.parse_args()
+
+    logger.add(
+        f"master_server_{args.shard_id}.log", serialize=True, rotation="10 MB"
+    )
+    server = MasterServer(
+        args.host, args.port, args.shard_id, args.heartbeat_timeout
+    )
     server.serve_forever()
@@ -0,0 +1,40 @@
+#!/usr/bin/python3
+import bisect
+import hashlib
+
+
+class ConsistentHashRing:
+    """Maps keys (video ids) onto master shards using virtual nodes."""
+
+    def __init__(self, shards=None, replicas=100):
+        self.replicas = replicas
+        self._ring = []
+        self._owners = {}
+        self.shards = []
+
+        for shard in shards or []:
+            self.add_shard(shard)
+
+    @staticmethod
+    def _hash(key):
+        return int(hashlib.md5(key.encode("utf-8")).hexdigest()[:16], 16)
+
+    def add_shard(self, shard):
+        if shard in self.shards:
+            return
+        self.shards.append(shard)
+
+        for i in range(self.replicas):
+            point = self._hash(f"{shard}#{i}")
+            bisect.insort(self._ring, point)
+            self._owners[point] = shard
+
+    def get_shard(self, key):
+        if not self._ring:
+            raise LookupError("No master shards configured")
+
+        index = bisect.bisect(self._ring, self._hash(key)) % len(self._ring)
+        return self._owners[self._ring[index]]
+
+    def __len__(self):
+        return len(self.shards)
@@ -0,0 +1,286 @@
+#!/usr/bin/python3
+from concurrent.futures import Future, ThreadPoolExecutor
+from collections import OrderedDict, deque
+from loguru import logger
+import heapq
+import itertools
+import threading
+import time
+import uuid
+
+
+def new_job_id():
+    return uuid.uuid4().hex[:12]
+
+
+class UploadJob:
+    def __init__(self, title, filename, job_id=None):
+        self.job_id = job_id or new_job_id()
+        self.title = title
+        self.filename = filename
+        self.status = "queued"
+        self.error = None
+
+        self.chunk_count = 0
+        self.chunks_uploaded = 0
+        self.chunks_failed = 0
+        self.chunk_retries = 0
+        self.bytes_uploaded = 0
+
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    def to_dict(self):
+        if self.started_at is None:
+            elapsed = 0
+        else:
+            elapsed = (self.finished_at or time.time()) - self.started_at
+
+        return {
+            "job_id": self.job_id,
+            "title": self.title,
+            "filename": self.filename,
+            "status": self.status,
+            "error": self.error,
+            "chunk_count": self.chunk_count,
+            "chunks_uploaded": self.chunks_uploaded,
+            "chunks_failed": self.chunks_failed,
+            "chunk_retries": self.chunk_retries,
+            "bytes_uploaded": self.bytes_uploaded,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "elapsed": elapsed,
+            "throughput_mbps": (
+                self.bytes_uploaded / elapsed / (1024**2) if elapsed else 0.0
+            ),
+        }
+
+
+class UploadManager:
+    """Process-wide upload scheduler.
+
+    Jobs run on a small job pool; their chunks share one bounded chunk pool,
+    which is the global limit on concurrent chunk uploads. Each chunk server
+    additionally gets its own pending queue: a chunk only reaches the pool
+    once its server has a free slot, so a slow server holds at most
+    per_server_limit pool workers. Failed chunks are retried on the next
+    server in rotation after a backoff kept on one scheduler thread.
+    """
+
+    def __init__(
+        self,
+        upload_chunk,
+        delete_chunk=None,
+        job_workers=4,
+        chunk_workers=16,
+        per_server_limit=4,
+        max_retries=3,
+        retry_backoff=0.5,
+        history_size=100,
+    ):
+        self.upload_chunk = upload_chunk
+        self.delete_chunk = delete_chunk
+        self.per_server_limit = per_server_limit
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.history_size = history_size
+
+        self.job_pool = ThreadPoolExecutor(
+            max_workers=job_workers, thread_name_prefix="upload-job"
+        )
+        self.chunk_pool = ThreadPoolExecutor(
+            max_workers=chunk_workers, thread_name_prefix="upload-chunk"
+        )
+
+        self.jobs = OrderedDict()
+        self.lock = threading.Lock()
+        # server id -> attempts waiting for a slot / attempts on the pool
+        self.server_queues = {}
+        self.server_active = {}
+
+        # Retries waiting out their backoff: (due, seq, attempt) heap
+        self.retry_heap = []
+        self.retry_seq = itertools.count()
+        self.retry_cond = threading.Condition()
+        self.retry_thread = None
+
+    def submit(self, target, *args, title="Untitled", filename=None, job_id=None):
+        job = UploadJob(title, filename, job_id)
+        with self.lock:
+            self.jobs[job.job_id] = job
+            self._trim_history()
+
+        self.job_pool.submit(self._run_job, job, target, *args)
+        logger.info("Upload job queued", job_id=job.job_id, title=title)
+        return job
+
+    def _run_job(self, job, target, *args):
+        job.status = "in_progress"
+        job.started_at = time.time()
+        try:
+            target(job, *args)
+            job.status = "completed"
+            logger.info("Upload job completed", job_id=job.job_id)
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            logger.error(f"Upload job {job.job_id} failed: {e}")
+        finally:
+            job.finished_at = time.time()
+
+    def _trim_history(self):
+        finished = [
+            job_id
+            for job_id, job in self.jobs.items()
+            if job.status in ("completed", "failed")
+        ]
+        for job_id in finished[: max(0, len(self.jobs) - self.history_size)]:
+            del self.jobs[job_id]
+
+    def upload_chunks(self, job, chunks, chunk_servers):
+        """Upload chunks on the shared pool; returns the server id of each chunk.
+
+        Raises RuntimeError if any chunk still fails after its retries; the
+        chunks that did upload are deleted again first.
+        """
+        if not chunk_servers:
+            raise RuntimeError("No chunk servers available")
+
+        job.chunk_count = len(chunks)
+        results = [Future() for _ in chunks]
+        for chunk, result in zip(chunks, results):
+            self._dispatch(job, chunk, chunk_servers, result, 0)
+        placements = [result.result() for result in results]
+
+        if job.chunks_failed:
+            self.discard_chunks(chunks, placements, chunk_servers)
+            raise RuntimeError(
+                f"{job.chunks_failed} of {job.chunk_count} chunks failed to upload"
+            )
+        return placements
+
+    def _dispatch(self, job, chunk, chunk_servers, result, attempt):
+        """Hand an attempt to the chunk pool, or queue it while its server is full."""
+        try:
+            server = chunk_servers[(chunk["sequence"] + attempt) % len(chunk_servers)]
+            task = (job, chunk, result, attempt, chunk_servers, server)
+            with self.lock:
+                active = self.server_active.get(server["id"], 0)
+                if active >= self.per_server_limit:
+                    self.server_queues.setdefault(server["id"], deque()).append(task)
+                    return
+                self.server_active[server["id"]] = active + 1
+            self.chunk_pool.submit(self._upload_chunk, *task)
+        except Exception as e:
+            self._fail(result, e)
+
+    def _release_slot(self, server_id):
+        """Pass a finished attempt's slot to the next attempt queued for it."""
+        with self.lock:
+            queue = self.server_queues.get(server_id)
+            if not queue:
+                self.server_active[server_id] -= 1
+                return
+            task = queue.popleft()
+
+        try:
+            self.chunk_pool.submit(self._upload_chunk, *task)
+        except Exception as e:
+            self._fail(task[2], e)
+
+    @staticmethod
+    def _fail(result, error):
+        # Never leave a chunk unresolved: upload_chunks is blocked on it
+        if not result.done():
+            result.set_exception(error)
+
+    def _upload_chunk(self, job, chunk, result, attempt, chunk_servers, server):
+        try:
+            try:
+                uploaded = self.upload_chunk(chunk, server)
+            except Exception as e:
+                logger.error(f"Chunk {chunk['chunk_id']} upload raised: {e}")
+                uploaded = False
+            finally:
+                self._release_slot(server["id"])
+
+            if uploaded:
+                with self.lock:
+                    job.chunks_uploaded += 1
+                    job.bytes_uploaded += chunk["size"]
+                result.set_result(server["id"])
+                return
+
+            if attempt < self.max_retries:
+                with self.lock:
+                    job.chunk_retries += 1
+                self._schedule_retry(
+                    self.retry_backoff * (2**attempt),
+                    (job, chunk, chunk_servers, result, attempt + 1),
+                )
+                return
+
+            with self.lock:
+                job.chunks_failed += 1
+            logger.error(
+                f"Chunk {chunk['chunk_id']} failed after {self.max_retries} retries"
+            )
+            result.set_result(None)
+        except Exception as e:
+            self._fail(result, e)
+
+    def _schedule_retry(self, delay, attempt):
+        with self.retry_cond:
+            heapq.heappush(
+                self.retry_heap,
+                (time.monotonic() + delay, next(self.retry_seq), attempt),
+            )
+            if self.retry_thread is None:
+                self.retry_thread = threading.Thread(
+                    target=self._retry_loop, name="upload-retry", daemon=True
+                )
+                self.retry_thread.start()
+            self.retry_cond.notify()
+
+    def _retry_loop(self):
+        while True:
+            with self.retry_cond:
+                while not self.retry_heap:
+                    self.retry_cond.wait()
+                delay = self.retry_heap[0][0] - time.monotonic()
+                if delay > 0:
+                    self.retry_cond.wait(delay)
+                    continue
+                attempt = heapq.heappop(self.retry_heap)[2]
+            self._dispatch(*attempt)
+
+    def discard_chunks(self, chunks, placements, chunk_servers):
+        """Best-effort delete of uploaded chunks belonging to a failed job."""
+        if self.delete_chunk is None:
+            return
+
+        servers = {server["id"]: server for server in chunk_servers}
+        for chunk, server_id in zip(chunks, placements):
+            if server_id is None:
+                continue
+            try:
+                self.delete_chunk(chunk, servers[server_id])
+            except Exception as e:
+                logger.error(f"Deleting chunk {chunk['chunk_id']} failed: {e}")
+
+    def get_job(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+        return job.to_dict() if job else None
+
+    def get_status(self):
+        with self.lock:
+            jobs = [job.to_dict() for job in self.jobs.values()]
+
+        counts = {"queued": 0, "in_progress": 0, "completed": 0, "failed": 0}
+        for job in jobs:
+            counts[job["status"]] += 1
+
+        return {**counts, "jobs": jobs}
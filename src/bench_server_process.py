@@ -0,0 +1,118 @@
+"""
+Microbenchmark for the server_process worker pool.
+
+Compares the work-stealing deques and per-worker stat slots against the
+previous design (one shared queue.Queue plus a global counters lock) from
+1 to 64 workers. Producers call handle_request directly, bypassing XML-RPC,
+and tasks do no simulated work, so the numbers measure pure queueing and
+bookkeeping overhead.
+
+    python bench_server_process.py --tasks 20000 --producers 4
+"""
+import argparse
+import contextlib
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+import server_process
+
+
+class SharedQueueServer:
+    """The previous design: one Queue and one lock for all workers."""
+
+    def __init__(self, max_workers):
+        self.max_workers = max_workers
+        self.task_queue = queue.Queue()
+        self.counters_lock = threading.Lock()
+        self.tasks_processed = 0
+        self.active_tasks = 0
+
+    def _worker(self):
+        while True:
+            task_data = self.task_queue.get()
+            if task_data is None:
+                self.task_queue.task_done()
+                break
+            print(f"[WORKER] START processing task: {task_data}")
+            with self.counters_lock:
+                self.active_tasks += 1
+            time.sleep(0)
+            print(f"[WORKER] FINISHED task: {task_data} (took 0s)")
+            with self.counters_lock:
+                self.tasks_processed += 1
+                self.active_tasks -= 1
+            self.task_queue.task_done()
+
+    def start_workers(self):
+        for _ in range(self.max_workers):
+            threading.Thread(target=self._worker, daemon=True).start()
+
+    def handle_request(self, message):
+        timestamp = datetime.now().strftime("%H:%M:%S")
+        task_id = f"TASK-{timestamp}-{hash(message) % 1000:04d}"
+        print(f"[RPC-LISTENER] Received: '{message}' -> queued as {task_id}")
+        print(f"[QUEUE-STATS] Queue size before: {self.task_queue.qsize()}")
+        self.task_queue.put({"id": task_id, "message": message})
+        print(f"[QUEUE-STATS] Queue size after: {self.task_queue.qsize()}")
+        with self.counters_lock:
+            busy = self.active_tasks
+        return {"queue_size": self.task_queue.qsize(), "workers_busy": busy}
+
+    def get_stats(self):
+        with self.counters_lock:
+            return {"tasks_processed": self.tasks_processed}
+
+    def shutdown(self):
+        for _ in range(self.max_workers):
+            self.task_queue.put(None)
+        self.task_queue.join()
+
+
+def run(server, tasks, producers):
+    server.start_workers()
+    per_producer = tasks // producers
+
+    def produce(producer_id):
+        for i in range(per_producer):
+            server.handle_request(f"bench-{producer_id}-{i}")
+
+    threads = [threading.Thread(target=produce, args=(p,)) for p in range(producers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    while server.get_stats()["tasks_processed"] < per_producer * producers:
+        time.sleep(0.001)
+    elapsed = time.perf_counter() - start
+
+    server.shutdown()
+    return per_producer * producers / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="server_process worker pool benchmark")
+    parser.add_argument("--tasks", type=int, default=20000)
+    parser.add_argument("--producers", type=int, default=4)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64])
+    args = parser.parse_args()
+
+    server_process.PROCESSING_TIME_RANGE = (0, 0)
+
+    print(f"{'workers':>7} {'shared queue':>14} {'work stealing':>14}  (tasks/s)")
+    for workers in args.workers:
+        # Both servers print per task; keep that out of the measurement
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            shared = run(SharedQueueServer(workers), args.tasks, args.producers)
+            stealing = run(
+                server_process.RPCServer(max_workers=workers), args.tasks, args.producers
+            )
+        print(f"{workers:>7} {shared:>14.0f} {stealing:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 import xmlrpc.server
 import threading
-import queue
+import collections
+import itertools
 import time
 import random
 from datetime import datetime
@@ -10,88 +11,202 @@ import socketserver
 # Configuration
 MAX_WORKERS = 3
 RPC_PORT = 9002
-TASK_QUEUE = queue.Queue()
+PROCESSING_TIME_RANGE = (1, 5)  # simulated seconds of work per task
+STEAL_ATTEMPTS = 2  # random peers an idle worker tries to steal from
 
-# new: simple thread-safe counters to track activity
-tasks_processed = 0
-active_tasks = 0
-counters_lock = threading.Lock()
 
-def worker_function(worker_id):
+class WorkerState:
     """
-    Worker thread that processes tasks from the queue.
-    Simulates time-consuming work.
+    Per-worker task deque and stat slot.
+
+    Only the owning worker writes its stats, so they need no lock; get_stats
+    aggregates them across workers on demand. Other workers steal from the
+    opposite end of the deque when their own runs dry.
     """
-    # Declare globals once at function start
-    global active_tasks, tasks_processed
-    
+
+    def __init__(self, worker_id):
+        self.worker_id = worker_id
+        self.tasks = collections.deque()
+        self.wakeup = threading.Event()
+        self.parked = False  # guarded by IdleWorkers.lock
+
+        self.tasks_processed = 0
+        self.tasks_stolen = 0
+        self.active_tasks = 0
+
+
+class IdleWorkers:
+    """
+    Stack of parked workers. Idle workers block on their wakeup event
+    instead of polling; handle_request wakes one when it enqueues a task.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stack = []
+
+    def park(self, worker):
+        with self.lock:
+            if not worker.parked:
+                worker.parked = True
+                self.stack.append(worker)
+
+    def unpark(self, worker):
+        with self.lock:
+            if worker.parked:
+                worker.parked = False
+                self.stack.remove(worker)
+
+    def wake_one(self, preferred):
+        """Wake the preferred worker if parked, else the most recently parked."""
+        # Unlocked fast path: a worker that parks after this check re-scans
+        # the deques before sleeping, so it still sees the new task
+        if not self.stack:
+            return
+        with self.lock:
+            if preferred.parked:
+                target = preferred
+                self.stack.remove(preferred)
+            elif self.stack:
+                target = self.stack.pop()
+            else:
+                return
+            target.parked = False
+        target.wakeup.set()
+
+
+class PoolTally:
+    """
+    Pool-wide totals readable in O(1) by handle_request. Every queued or
+    running task holds one token in the matching deque; deque append and
+    pop are atomic, so producers and workers need no shared lock.
+    """
+
+    def __init__(self):
+        self.queued = collections.deque()
+        self.busy = collections.deque()
+
+
+def take_task(worker, workers, scan_all=False):
+    """
+    Pop the worker's oldest task, or steal the newest task from a peer.
+    Peers are sampled at random so an idle worker's cost does not grow with
+    the pool size; scan_all checks every peer (used when draining).
+    """
+    try:
+        return worker.tasks.popleft()
+    except IndexError:
+        pass
+
+    count = len(workers)
+    if scan_all or count <= STEAL_ATTEMPTS + 1:
+        victims = [workers[(worker.worker_id + i) % count] for i in range(1, count)]
+    else:
+        victims = [workers[random.randrange(count)] for _ in range(STEAL_ATTEMPTS)]
+
+    for victim in victims:
+        # Skip empty deques without paying for an IndexError
+        if victim is worker or not victim.tasks:
+            continue
+        try:
+            task_data = victim.tasks.pop()
+        except IndexError:
+            continue
+        worker.tasks_stolen += 1
+        return task_data
+
+    return None
+
+
+def worker_function(worker_id, workers, idle, tally, stopping):
+    """
+    Worker thread that processes tasks from its own deque, stealing from
+    other workers when idle. Simulates time-consuming work.
+    """
+    worker = workers[worker_id]
+
     print(f"[WORKER-{worker_id}] Started and waiting for tasks...")
-    
+
     while True:
-        try:
-            # Get a task from the queue (blocks until available)
-            task_data = TASK_QUEUE.get()
-            
-            # Check for shutdown signal
-            if task_data is None:
+        draining = stopping.is_set()
+        task_data = take_task(worker, workers, scan_all=draining)
+
+        if task_data is None:
+            # Only exit once a full scan has found every deque drained
+            if draining:
                 print(f"[WORKER-{worker_id}] Received shutdown signal")
-                TASK_QUEUE.task_done()
                 break
-                
+
+            # Park, then re-scan so a task enqueued meanwhile is not missed
+            idle.park(worker)
+            task_data = take_task(worker, workers, scan_all=True)
+            if task_data is None:
+                worker.wakeup.wait()
+                worker.wakeup.clear()
+                idle.unpark(worker)
+                continue
+            idle.unpark(worker)
+        tally.queued.pop()
+
+        try:
             print(f"[WORKER-{worker_id}] START processing task: {task_data}")
-            
-            # Simulate variable processing time (1-5 seconds)
-            processing_time = random.randint(1, 5)
-            
+
+            # Simulate variable processing time
+            processing_time = random.randint(*PROCESSING_TIME_RANGE)
+
             # mark as active
-            with counters_lock:
-                active_tasks += 1
-            
+            worker.active_tasks = 1
+            tally.busy.append(None)
+
             time.sleep(processing_time)
-            
+
             print(f"[WORKER-{worker_id}] FINISHED task: {task_data} (took {processing_time}s)")
-            
-            # update counters
-            with counters_lock:
-                tasks_processed += 1
-                active_tasks -= 1
-            
-            # Mark task as completed
-            TASK_QUEUE.task_done()
-            
+
+            worker.tasks_processed += 1
+
         except Exception as e:
             print(f"[WORKER-{worker_id}] Error processing task: {e}")
-            # in error path, ensure we decrement active counter if we had incremented it
-            with counters_lock:
-                try:
-                    active_tasks -= 1
-                except:
-                    pass
-            TASK_QUEUE.task_done()
+        finally:
+            if worker.active_tasks:
+                tally.busy.pop()
+            worker.active_tasks = 0
 
 class RPCServer:
     """
     RPC Server that handles incoming requests and delegates to thread pool.
     """
     
-    def __init__(self):
+    def __init__(self, max_workers=MAX_WORKERS):
+        self.max_workers = max_workers
+        self.workers = [WorkerState(i) for i in range(max_workers)]
+        self.idle = IdleWorkers()
+        self.tally = PoolTally()
         self.worker_threads = []
+        self.stopping = threading.Event()
+        self.next_worker = itertools.count()
         self.start_time = datetime.now()
         
     def start_workers(self):
         """Initialize and start the worker thread pool."""
-        print(f"[SERVER] Starting {MAX_WORKERS} worker threads...")
+        print(f"[SERVER] Starting {self.max_workers} worker threads...")
         
-        for i in range(MAX_WORKERS):
+        for i in range(self.max_workers):
             worker = threading.Thread(
                 target=worker_function,
-                args=(i,),
+                args=(i, self.workers, self.idle, self.tally, self.stopping),
                 daemon=True
             )
             worker.start()
             self.worker_threads.append(worker)
             
-        print(f"[SERVER] Worker pool initialized with {MAX_WORKERS} threads")
+        print(f"[SERVER] Worker pool initialized with {self.max_workers} threads")
+
+    def queue_size(self):
+        """Tasks waiting across all worker deques."""
+        return len(self.tally.queued)
+
+    def workers_busy(self):
+        return len(self.tally.busy)
     
     def handle_request(self, message):
         """
@@ -102,54 +217,56 @@ class RPCServer:
         task_id = f"TASK-{timestamp}-{hash(message) % 1000:04d}"
         
         print(f"[RPC-LISTENER] Received: '{message}' -> queued as {task_id}")
-        print(f"[QUEUE-STATS] Queue size before: {TASK_QUEUE.qsize()}")
         
-        # Immediate handoff to thread pool
-        TASK_QUEUE.put({
+        # Immediate handoff to a worker deque, round-robin. If that worker
+        # is busy, a parked peer is woken to steal the task instead
+        worker = self.workers[next(self.next_worker) % self.max_workers]
+        # Token first, so a worker that takes the task always finds one
+        self.tally.queued.append(None)
+        worker.tasks.append({
             'id': task_id,
             'message': message,
             'received_at': timestamp
         })
+        worker_queue_size = len(worker.tasks)
+        self.idle.wake_one(worker)
         
-        print(f"[QUEUE-STATS] Queue size after: {TASK_QUEUE.qsize()}")
-        
-        # Return immediate acknowledgment with a better busy metric
-        with counters_lock:
-            current_active = active_tasks
+        print(f"[QUEUE-STATS] WORKER-{worker.worker_id} queue size: {worker_queue_size}")
         
+        # Return immediate acknowledgment
         return {
             'status': 'ACK',
             'task_id': task_id,
             'queued_at': timestamp,
-            'queue_size': TASK_QUEUE.qsize(),
-            'workers_busy': current_active
+            'queue_size': self.queue_size(),
+            'workers_busy': self.workers_busy(),
+            'worker_id': worker.worker_id,
+            'worker_queue_size': worker_queue_size
         }
     
     def get_stats(self):
         """RPC method: Returns server statistics."""
-        with counters_lock:
-            current_active = active_tasks
-            total_processed = tasks_processed
-        
         return {
             'uptime': str(datetime.now() - self.start_time),
-            'queue_size': TASK_QUEUE.qsize(),
+            'queue_size': self.queue_size(),
             'active_workers': len(self.worker_threads),
-            'max_workers': MAX_WORKERS,
-            'workers_busy': current_active,
-            'tasks_processed': total_processed
+            'max_workers': self.max_workers,
+            'workers_busy': self.workers_busy(),
+            'tasks_processed': sum(w.tasks_processed for w in self.workers),
+            'tasks_stolen': sum(w.tasks_stolen for w in self.workers)
         }
     
     def shutdown(self):
         """Gracefully shutdown the server (for testing)."""
         print("[SERVER] Shutting down worker threads...")
         
-        # Send shutdown signals to all workers
-        for _ in range(MAX_WORKERS):
-            TASK_QUEUE.put(None)
+        # Workers finish every queued task before exiting
+        self.stopping.set()
+        for worker in self.workers:
+            worker.wakeup.set()
         
-        # Wait for all tasks to complete
-        TASK_QUEUE.join()
+        for thread in self.worker_threads:
+            thread.join()
         print("[SERVER] All workers shut down")
 
 def start_server():
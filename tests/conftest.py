@@ -0,0 +1,8 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# flask/ and src/ are run as script directories, so import their modules flat
+for directory in ("flask", "src"):
+    sys.path.insert(0, os.path.join(ROOT, directory))
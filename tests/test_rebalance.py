@@ -0,0 +1,158 @@
+import threading
+
+import pytest
+
+import app
+from master_server import MasterServer
+from shard_ring import ConsistentHashRing
+
+VIDEO = {
+    "title": "t",
+    "filename": "f.mp4",
+    "chunk_count": 0,
+    "chunk_servers": [],
+    "total_size": 0,
+    "upload_time": 0,
+}
+
+
+@pytest.fixture
+def masters():
+    """Start masters on demand; returns {url: MasterServer}."""
+    started = {}
+
+    def start():
+        master = MasterServer("localhost", 0)
+        threading.Thread(target=master.serve_forever, daemon=True).start()
+        url = f"http://localhost:{master.server.server_address[1]}"
+        started[url] = master
+        return url
+
+    started["start"] = start
+    yield started
+
+    for url, master in started.items():
+        if url != "start":
+            master.server.shutdown()
+            master.server.server_close()
+
+
+def client(*urls):
+    # A long probe interval keeps map adoption under the test's control
+    return app.MasterClient(list(urls), probe_interval=3600)
+
+
+def register(client, count, prefix="vid"):
+    for i in range(count):
+        client.register_upload(dict(VIDEO, video_id=f"{prefix}_{i}"))
+
+
+def readable(client, count, prefix="vid"):
+    return sum(
+        client.get_video_details(f"{prefix}_{i}") is not None for i in range(count)
+    )
+
+
+def test_add_shard_moves_only_videos_it_now_owns(masters):
+    a, b, c = masters["start"](), masters["start"](), masters["start"]()
+    c1 = client(a, b)
+    register(c1, 50)
+
+    moved = c1.add_shard(c)
+
+    ring = ConsistentHashRing([a, b, c])
+    owned = {
+        url: sorted(v["video_id"] for v in masters[url].list_videos())
+        for url in (a, b, c)
+    }
+    assert moved == len(owned[c]) > 0
+    for url, video_ids in owned.items():
+        assert all(ring.get_shard(v) == url for v in video_ids)
+    assert readable(c1, 50) == 50
+    assert masters[a].get_shard_map() == {"version": 1, "shards": [a, b, c]}
+
+
+def test_failed_add_leaves_ring_unchanged(masters):
+    a, b = masters["start"](), masters["start"]()
+    c1 = client(a, b)
+    register(c1, 20)
+
+    with pytest.raises(ConnectionError):
+        c1.add_shard("http://localhost:1")
+
+    assert c1.masters == [a, b]
+    assert "http://localhost:1" not in c1.shard_status
+    assert readable(c1, 20) == 20
+    assert masters[a].get_shard_map()["version"] == 0
+
+
+def test_stale_client_rebases_its_add_on_the_newest_map(masters):
+    a, b, c, d = (masters["start"]() for _ in range(4))
+    c1, stale = client(a, b), client(a, b)
+    register(c1, 50)
+
+    c1.add_shard(c)
+    stale.add_shard(d)
+
+    fresh = client(a, b)
+    fresh._refresh_shard_maps()
+    assert fresh.map_version == 2
+    assert fresh.masters == [a, b, c, d]
+    assert readable(fresh, 50) == 50
+    assert readable(stale, 50) == 50
+
+
+def test_concurrent_adds_in_one_process_are_serialized(masters):
+    a, b, c, d = (masters["start"]() for _ in range(4))
+    c1 = client(a, b)
+    register(c1, 50)
+
+    threads = [threading.Thread(target=c1.add_shard, args=(url,)) for url in (c, d)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(c1.masters) == sorted([a, b, c, d])
+    assert masters[a].get_shard_map()["version"] == 2
+    assert readable(c1, 50) == 50
+
+
+def test_rejected_publish_removes_copies_and_drops_nothing(masters):
+    a, b, c, d = (masters["start"]() for _ in range(4))
+    c1, stale = client(a, b), client(a, b)
+    register(c1, 50)
+    c1.add_shard(c)
+    # Simulate a map published between the stale client's read and its write
+    stale._refresh_shard_maps = lambda: None
+
+    with pytest.raises(RuntimeError):
+        stale.add_shard(d)
+
+    assert masters[d].list_videos() == []
+    assert stale.masters == [a, b]
+    assert sum(len(masters[url].list_videos()) for url in (a, b, c)) == 50
+
+
+def test_late_writes_on_old_owner_are_found_and_caught_up(masters):
+    a, b, c = masters["start"](), masters["start"](), masters["start"]()
+    c1 = client(a, b)
+    c1.add_shard(c)
+
+    # A process still on the old ring registers straight on the old owner
+    old_ring = ConsistentHashRing([a, b])
+    late = [
+        f"late_{i}"
+        for i in range(200)
+        if c1.ring.get_shard(f"late_{i}") == c
+    ][:5]
+    for video_id in late:
+        masters[old_ring.get_shard(video_id)].register_video(
+            dict(VIDEO, video_id=video_id)
+        )
+
+    assert all(c1.get_video_details(v) is not None for v in late)
+
+    c1._catch_up(c)
+    assert sorted(v["video_id"] for v in masters[c].list_videos()) == sorted(late)
+    assert all(c1.get_video_details(v) is not None for v in late)
@@ -0,0 +1,104 @@
+import contextlib
+import io
+import itertools
+import time
+
+import pytest
+
+import server_process
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    """Start an RPCServer with quiet workers; shut it down afterwards."""
+    servers = []
+
+    def start(max_workers, processing_time=(0, 0)):
+        monkeypatch.setattr(server_process, "PROCESSING_TIME_RANGE", processing_time)
+        server = server_process.RPCServer(max_workers=max_workers)
+        with contextlib.redirect_stdout(io.StringIO()):
+            server.start_workers()
+        servers.append(server)
+        return server
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield start
+        for server in servers:
+            server.shutdown()
+
+
+def wait_for_processed(server, count, timeout=10):
+    deadline = time.time() + timeout
+    while server.get_stats()["tasks_processed"] < count:
+        assert time.time() < deadline, "tasks were not processed in time"
+        time.sleep(0.01)
+
+
+def test_ack_reports_pool_totals_and_target_worker(pool):
+    server = pool(2, processing_time=(1, 1))
+    time.sleep(0.05)  # let the workers park
+
+    acks = [server.handle_request(f"m{i}") for i in range(4)]
+
+    assert [ack["worker_id"] for ack in acks] == [0, 1, 0, 1]
+    assert {"status", "task_id", "queued_at", "queue_size", "workers_busy"} <= set(
+        acks[0]
+    )
+
+    # Both workers are on their first 1 s task; the other two wait
+    time.sleep(0.2)
+    ack = server.handle_request("m4")
+    assert ack["workers_busy"] == 2
+    assert ack["queue_size"] == 3
+    assert ack["worker_queue_size"] == 2
+
+    wait_for_processed(server, 5)
+    wait_for_processed(server, 4)
+    assert server.get_stats()["queue_size"] == 0
+    assert server.get_stats()["workers_busy"] == 0
+
+
+def test_every_task_is_processed_once(pool):
+    server = pool(8)
+
+    for i in range(2000):
+        server.handle_request(f"m{i}")
+
+    wait_for_processed(server, 2000)
+    time.sleep(0.05)
+    assert server.get_stats()["tasks_processed"] == 2000
+
+
+def test_idle_worker_is_woken_to_steal_from_a_busy_one(pool):
+    server = pool(2, processing_time=(1, 1))
+    # Route every task to worker 0; worker 1 only gets work by stealing
+    server.next_worker = itertools.repeat(0)
+    time.sleep(0.05)
+
+    started = time.time()
+    server.handle_request("first")
+    server.handle_request("second")
+    wait_for_processed(server, 2)
+
+    assert time.time() - started < 1.8
+    assert server.get_stats()["tasks_stolen"] == 1
+
+
+def test_idle_workers_park_instead_of_polling(pool):
+    server = pool(16)
+    time.sleep(0.1)
+
+    assert len(server.idle.stack) == 16
+    assert all(worker.parked for worker in server.workers)
+
+
+def test_shutdown_drains_queued_tasks(pool):
+    server = pool(2, processing_time=(0, 0))
+    for i in range(200):
+        server.handle_request(f"m{i}")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        server.shutdown()
+
+    assert server.get_stats()["tasks_processed"] == 200
+    assert server.get_stats()["queue_size"] == 0
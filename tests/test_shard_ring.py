@@ -0,0 +1,45 @@
+import pytest
+
+from shard_ring import ConsistentHashRing
+
+KEYS = [f"vid_{i}" for i in range(2000)]
+
+
+def test_empty_ring_raises():
+    with pytest.raises(LookupError):
+        ConsistentHashRing().get_shard("vid_0")
+
+
+def test_lookup_is_deterministic_and_independent_of_insert_order():
+    ring = ConsistentHashRing(["a", "b", "c"])
+    reordered = ConsistentHashRing(["c", "a", "b"])
+
+    assert [ring.get_shard(k) for k in KEYS] == [reordered.get_shard(k) for k in KEYS]
+
+
+def test_duplicate_shard_is_ignored():
+    ring = ConsistentHashRing(["a", "b"])
+    ring.add_shard("a")
+
+    assert len(ring) == 2
+    assert len(ring._ring) == 2 * ring.replicas
+
+
+def test_keys_spread_across_shards():
+    ring = ConsistentHashRing(["a", "b", "c"])
+    counts = {shard: 0 for shard in ring.shards}
+    for key in KEYS:
+        counts[ring.get_shard(key)] += 1
+
+    for count in counts.values():
+        assert count > len(KEYS) / 3 * 0.7
+
+
+def test_adding_a_shard_only_moves_keys_to_it():
+    before = ConsistentHashRing(["a", "b", "c"])
+    after = ConsistentHashRing(["a", "b", "c", "d"])
+
+    moved = [k for k in KEYS if before.get_shard(k) != after.get_shard(k)]
+    assert moved
+    assert all(after.get_shard(k) == "d" for k in moved)
+    assert len(moved) < len(KEYS) / 2
@@ -0,0 +1,143 @@
+import threading
+import time
+
+import pytest
+
+from upload_manager import UploadJob, UploadManager
+
+
+def make_chunks(count, prefix="c"):
+    return [
+        {"chunk_id": f"{prefix}_{i}", "sequence": i, "size": 10} for i in range(count)
+    ]
+
+
+def manager(upload_chunk, **kwargs):
+    kwargs.setdefault("retry_backoff", 0.01)
+    return UploadManager(upload_chunk, **kwargs)
+
+
+def test_failed_chunks_are_retried_on_the_next_server():
+    attempts = []
+
+    def upload(chunk, server):
+        attempts.append(server["id"])
+        return server["id"] != "dead"
+
+    job = UploadJob("t", "f")
+    placements = manager(upload).upload_chunks(
+        job, make_chunks(4), [{"id": "dead"}, {"id": "ok"}]
+    )
+
+    assert placements == ["ok"] * 4
+    assert job.chunks_uploaded == 4
+    assert job.chunk_retries == 2  # the two chunks that started on "dead"
+    assert job.bytes_uploaded == 40
+
+
+def test_exhausted_retries_fail_the_job_and_discard_uploaded_chunks():
+    deleted = []
+
+    def upload(chunk, server):
+        return chunk["sequence"] != 0
+
+    uploads = manager(
+        upload,
+        delete_chunk=lambda chunk, server: deleted.append(chunk["chunk_id"]),
+        max_retries=2,
+    )
+    job = UploadJob("t", "f")
+
+    with pytest.raises(RuntimeError, match="1 of 5 chunks failed"):
+        uploads.upload_chunks(job, make_chunks(5), [{"id": "a"}, {"id": "b"}])
+
+    assert job.chunks_failed == 1
+    assert job.chunk_retries == 2
+    assert sorted(deleted) == [f"c_{i}" for i in range(1, 5)]
+
+
+def test_slow_server_does_not_starve_other_servers():
+    def upload(chunk, server):
+        time.sleep(1 if server["id"] == "slow" else 0.01)
+        return True
+
+    uploads = manager(upload, chunk_workers=8, per_server_limit=2)
+    slow = threading.Thread(
+        target=uploads.upload_chunks,
+        args=(UploadJob("s", "s"), make_chunks(4, "s"), [{"id": "slow"}]),
+    )
+    slow.start()
+    time.sleep(0.05)
+
+    started = time.time()
+    uploads.upload_chunks(UploadJob("f", "f"), make_chunks(10), [{"id": "fast"}])
+    assert time.time() - started < 0.5
+    slow.join()
+
+
+def test_per_server_limit_caps_concurrent_uploads():
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    def upload(chunk, server):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.02)
+        with lock:
+            active[0] -= 1
+        return True
+
+    uploads = manager(upload, chunk_workers=16, per_server_limit=3)
+    uploads.upload_chunks(UploadJob("t", "f"), make_chunks(20), [{"id": "a"}])
+
+    assert peak[0] == 3
+
+
+def test_retries_share_one_scheduler_thread():
+    uploads = manager(lambda chunk, server: False, chunk_workers=4, max_retries=3)
+    before = threading.active_count()
+
+    with pytest.raises(RuntimeError):
+        uploads.upload_chunks(UploadJob("t", "f"), make_chunks(30), [{"id": "dead"}])
+
+    # Chunk pool workers plus the single retry scheduler
+    assert threading.active_count() - before <= 4 + 1
+
+
+def test_unexpected_errors_resolve_the_chunk_instead_of_hanging():
+    uploads = manager(lambda chunk, server: True)
+    result = []
+
+    def run():
+        try:
+            uploads.upload_chunks(
+                UploadJob("t", "f"), make_chunks(3), [{"name": "no id"}]
+            )
+        except KeyError as e:
+            result.append(e)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(timeout=5)
+
+    assert not thread.is_alive()
+    assert result
+
+
+def test_finished_jobs_are_trimmed_to_history_size():
+    uploads = manager(lambda chunk, server: True, history_size=2)
+
+    def target(job):
+        uploads.upload_chunks(job, make_chunks(2), [{"id": "a"}])
+
+    jobs = []
+    for i in range(3):
+        jobs.append(uploads.submit(target, title=f"job {i}"))
+        while uploads.get_job(jobs[-1].job_id)["status"] != "completed":
+            time.sleep(0.01)
+
+    status = uploads.get_status()
+    assert status["completed"] == 2
+    assert uploads.get_job(jobs[0].job_id) is None
+    assert uploads.get_job(jobs[-1].job_id)["chunks_uploaded"] == 2